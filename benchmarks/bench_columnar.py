@@ -0,0 +1,45 @@
+"""
+Compare building a pandas DataFrame of client records via ResultContainer rows with the columnar export
+(see :mod:`pyglinet.columnar`).
+
+Usage: python benchmarks/bench_columnar.py [number_of_routers] [clients_per_router]
+"""
+import sys
+import timeit
+import pandas as pd
+from pyglinet import utils, columnar
+
+CLIENT = {"mac": "00:11:22:33:44:55", "ip": "192.168.8.100", "name": "client", "online": True, "iface": "2.4G",
+          "rx": 0, "tx": 0, "total_rx": 0, "total_tx": 0, "blocked": False, "alias": "", "type": 0}
+
+
+def generate(routers, clients):
+    return {f"router{r}": {"jsonrpc": "2.0", "id": 1, "result": {"clients": [dict(CLIENT, rx=i)
+                                                                             for i in range(clients)]}}
+            for r in range(routers)}
+
+
+def via_result_container(results):
+    rows = []
+    for host, data in results.items():
+        for client in utils.ResultContainer("clients__get_list", data["result"]).clients:
+            rows.append(dict({k: getattr(client, k) for k in client}, host=host))
+    return pd.DataFrame(rows)
+
+
+def via_columnar(results):
+    return columnar.to_pandas(columnar.concat(results))
+
+
+def main():
+    routers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    results = generate(routers, clients)
+    print(f"{routers} routers with {clients} clients each")
+    for name, func in [("ResultContainer", via_result_container), ("columnar", via_columnar)]:
+        duration = timeit.timeit(lambda: func(results), number=3) / 3
+        print(f"{name:<16} {duration * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
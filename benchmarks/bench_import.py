@@ -0,0 +1,36 @@
+"""
+Measure the time of ``import pyglinet`` in fresh interpreters and list the heavy dependencies it pulls in.
+
+Usage: python benchmarks/bench_import.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["requests", "passlib", "tabulate", "IPython"]
+
+
+def run(code, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    baseline = run("pass", runs)
+    total = run("import pyglinet", runs)
+    print(f"interpreter startup {baseline * 1e3:7.1f} ms")
+    print(f"import pyglinet     {(total - baseline) * 1e3:7.1f} ms (median of {runs} runs)")
+    loaded = subprocess.run([sys.executable, "-c", f"import sys, pyglinet; "
+                                                   f"print([m for m in {HEAVY_MODULES} if m in sys.modules])"],
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+    print(f"heavy modules loaded on import: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
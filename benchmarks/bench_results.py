@@ -0,0 +1,44 @@
+"""
+Compare memory footprint and attribute access speed of ResultContainer and the compact records generated from the
+documented example response (see GlInet parameter ``compact_results``).
+
+Usage: python benchmarks/bench_results.py [number_of_clients]
+"""
+import sys
+import timeit
+import tracemalloc
+from pyglinet import utils
+
+EXAMPLE = {"clients": [{"mac": "00:11:22:33:44:55", "ip": "192.168.8.100", "name": "client", "online": True,
+                        "iface": "2.4G", "rx": 0, "tx": 0, "total_rx": 0, "total_tx": 0, "blocked": False,
+                        "alias": "", "type": 0}]}
+
+
+def generate(n):
+    return {"clients": [dict(EXAMPLE["clients"][0], mac=f"00:11:22:33:{i // 256 % 256:02x}:{i % 256:02x}", rx=i)
+                        for i in range(n)]}
+
+
+def measure(name, build, data):
+    tracemalloc.start()
+    obj = build(data)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    build_time = timeit.timeit(lambda: build(data), number=3) / 3
+    clients = obj.clients
+    access_time = timeit.timeit(lambda: [c.rx for c in clients], number=10) / 10
+    print(f"{name:<16} memory {size / 2 ** 20:8.2f} MiB   build {build_time * 1e3:8.2f} ms   "
+          f"attribute access {access_time / len(clients) * 1e9:6.1f} ns/record")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data = generate(n)
+    schema = utils.record_schema("clients__get_list", EXAMPLE)
+    print(f"{n} client records")
+    measure("ResultContainer", lambda d: utils.ResultContainer("clients__get_list", d), data)
+    measure("CompactRecord", lambda d: utils.to_record(schema, d), data)
+
+
+if __name__ == "__main__":
+    main()
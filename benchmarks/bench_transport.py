@@ -0,0 +1,100 @@
+"""
+Compare the requests (HTTP/1.1) and the HTTP/2 transport under concurrency against local stub routers, which delay
+every request to emulate the processing time of a router. The stubs run in separate processes, such that they don't
+compete with the client for the GIL. Reports the number of connections opened to the router
+and the latency distribution. Requires ``pip install python-glinet[http2]``.
+
+Concurrency is configured only via max_concurrency, so the adaptive limiter decides how many requests are in flight
+as it would for users. The reached limit is reported.
+
+Usage: python benchmarks/bench_transport.py [concurrency] [requests_per_thread] [delay_ms]
+"""
+import logging
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import pickle
+import os
+from pyglinet import GlInet, loadgen
+from pyglinet.transport import Http2Transport
+
+RECORDING = [{"method": "call", "params": ["clients", "get_status"],
+              "response": {"jsonrpc": "2.0", "id": 1, "result": {"online": 3}}}]
+
+
+def serve(http2, delay, queue):
+    """
+    Serve stub router until None is received, then report the number of connections.
+    """
+    if http2:
+        router = loadgen.Http2StubRouter(RECORDING, delay=delay).start()
+    else:
+        router = loadgen.StubRouter(RECORDING, delay=delay)
+        threading.Thread(target=router.serve_forever, daemon=True).start()
+    queue.put(router.url)
+    queue.get()
+    queue.put(router.connections)
+    router.shutdown()
+
+
+def run(url, transport, concurrency, requests_per_thread, cache_folder):
+    glinet = GlInet(url=url, password="password", keep_alive=False, cache_folder=cache_folder,
+                    verify_ssl_certificate=True, transport=transport, max_concurrency=concurrency).login()
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        own = []
+        for _ in range(requests_per_thread):
+            start = time.perf_counter()
+            glinet.request("call", ["clients", "get_status"])
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    duration = time.perf_counter() - start
+    limit = glinet.limits["concurrency_limit"]
+    glinet.close()
+    latencies.sort()
+    return {"concurrency_limit": limit,
+            "throughput": len(latencies) / duration,
+            "p50": latencies[len(latencies) // 2],
+            "p99": latencies[int(len(latencies) * 0.99) - 1],
+            "p999": latencies[int(len(latencies) * 0.999) - 1],
+            "max": latencies[-1],
+            "stdev": statistics.pstdev(latencies)}
+
+
+def main():
+    logging.disable(logging.WARNING)
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    requests_per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 10) / 1e3
+    cache_folder = tempfile.mkdtemp()
+    with open(os.path.join(cache_folder, "api_reference.pkl"), "wb") as f:
+        pickle.dump({}, f)
+
+    print(f"{concurrency} threads x {requests_per_thread} calls, router delay {delay * 1e3:.0f} ms")
+    for name, http2, transport in [("requests", False, "requests"),
+                                   ("http2", True, Http2Transport(http1=False))]:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=serve, args=(http2, delay, queue), daemon=True)
+        process.start()
+        r = run(queue.get(timeout=30), transport, concurrency, requests_per_thread, cache_folder)
+        queue.put(None)
+        r["connections"] = queue.get(timeout=30)
+        process.join()
+        print(f"{name:<9} connections {r['connections']:4d}   limit {r['concurrency_limit']:3d}   "
+              f"throughput {r['throughput']:7.1f} req/s   p50 {r['p50'] * 1e3:6.1f} ms   "
+              f"p99 {r['p99'] * 1e3:6.1f} ms   p99.9 {r['p999'] * 1e3:6.1f} ms   max {r['max'] * 1e3:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
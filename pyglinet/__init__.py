@@ -6,6 +6,6 @@ __author__ = 'Thomas Fontana'
 
 from pyglinet.glinet import GlInet
 import logging
-import sys
 
-logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
\ No newline at end of file
+# logging is configured by the application, e.g. logging.basicConfig(level=logging.INFO)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
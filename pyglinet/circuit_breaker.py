@@ -0,0 +1,96 @@
+import threading
+import time
+import logging
+import pyglinet.exceptions as exceptions
+
+log = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single router. After `failure_threshold` consecutive connection failures the circuit opens
+    and requests fail immediately with :class:`~pyglinet.exceptions.CircuitOpenError`. Once `reset_timeout` has
+    passed, a single probe request is let through (half open). If the probe succeeds the circuit closes again,
+    otherwise it reopens and the timeout is doubled up to `max_reset_timeout`.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5, max_reset_timeout: float = 300):
+        """
+        :param failure_threshold: number of consecutive connection failures after which the circuit opens
+        :param reset_timeout: seconds until the first probe request is let through
+        :param max_reset_timeout: upper bound for the backoff of the probe interval
+        """
+        self.failure_threshold = failure_threshold
+        self.initial_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Current state: closed, open or half_open
+        """
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_request(self) -> None:
+        """
+        Check if a request may be sent.
+
+        :raises CircuitOpenError: if circuit is open or a probe request is already in flight
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise exceptions.CircuitOpenError(
+                        f"Router unreachable after {self.failures} consecutive failures. Retry in {remaining:.1f}s.")
+                self._state = self.HALF_OPEN
+            if self._probe_in_flight:
+                raise exceptions.CircuitOpenError("Router unreachable, waiting for probe request to finish.")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                log.info("Router reachable again, closing circuit.")
+            self._state = self.CLOSED
+            self.failures = 0
+            self.reset_timeout = self.initial_reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN:
+                self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self._open()
+            elif self._state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def record_ignored(self) -> None:
+        """
+        Record a request which failed for reasons unrelated to the reachability of the router, e.g. invalid
+        parameters. Neither counts as success nor as failure, but frees the probe slot in half open state.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self):
+        log.warning(f"Opening circuit after {self.failures} consecutive connection failures. "
+                    f"Next probe in {self.reset_timeout}s.")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
@@ -0,0 +1,173 @@
+"""
+Columnar export of api results for analysis, e.g. of the clients of a whole fleet of routers. Records are read from
+the decoded json response (see ``GlInet.request(..., raw=True)``) and nested fields are flattened to dotted column
+names. The columns are plain lists, which are handed to NumPy, pandas or Arrow in one go, without creating a
+ResultContainer per record.
+
+NumPy, pandas and pyarrow are optional and only imported by the respective conversion function.
+"""
+import itertools
+from typing import Union, List, Dict, Any
+
+Columns = Dict[str, List[Any]]
+
+
+def records(data: Union[dict, list], path: Union[str, None] = None, sep: str = ".") -> list:
+    """
+    Locate the list of records in a decoded json response.
+
+    :param data: decoded json response, or its result
+    :param path: path to the records below the result, e.g. "clients". If None, the only list in the result is used.
+        A result without a list is treated as a single record, e.g. the response of get_config.
+    :param sep: separator of the path
+
+    :return: list of records
+    """
+    if isinstance(data, dict) and "jsonrpc" in data:
+        data = data.get("result") or {}
+    if path is not None:
+        for key in path.split(sep):
+            data = data[key]
+        return data if isinstance(data, list) else [data]
+    if isinstance(data, list):
+        return data
+    lists = [value for value in data.values() if isinstance(value, list)]
+    if len(lists) == 1:
+        return lists[0]
+    elif len(lists) > 1:
+        raise ValueError(f"Result contains several lists, select one with parameter path: "
+                         f"{[k for k, v in data.items() if isinstance(v, list)]}")
+    return [data]
+
+
+def flatten(records: list, sep: str = ".") -> Columns:
+    """
+    Flatten records to columns. Nested dicts are flattened to column names joined by sep, e.g. "wifi.ssid", lists
+    are kept as values. Fields missing in a record are None.
+
+    :param records: list of dicts, other values are stored in the column "value"
+    :param sep: separator of nested column names
+
+    :return: dict of column name to list of values
+    """
+    types = set(map(type, records))
+    if not all(issubclass(t, dict) for t in types):
+        records = [r if isinstance(r, dict) else {"value": r} for r in records]
+    columns = {}
+    _flatten_into(columns, records, "", sep)
+    return columns
+
+
+def _flatten_into(columns: Columns, records: List[dict], prefix: str, sep: str) -> None:
+    # columns are extracted with one comprehension per field instead of visiting every record field by field
+    for key in dict.fromkeys(itertools.chain.from_iterable(records)):
+        name = prefix + str(key)
+        values = [r.get(key) for r in records]
+        types = set(map(type, values))
+        if not any(issubclass(t, dict) for t in types):
+            columns[name] = values
+            continue
+        if any(not issubclass(t, dict) for t in types - {type(None)}):
+            # scalars next to nested fields are kept in the column of the field itself
+            columns[name] = [None if isinstance(v, dict) else v for v in values]
+        _flatten_into(columns, [v if isinstance(v, dict) else {} for v in values], name + sep, sep)
+
+
+def _pad(columns: Columns, length: int) -> None:
+    for column in columns.values():
+        if len(column) < length:
+            column.extend([None] * (length - len(column)))
+
+
+def concat(results: Dict[str, Any],
+           path: Union[str, None] = None,
+           host_column: str = "host",
+           sep: str = ".") -> Columns:
+    """
+    Flatten the responses of many routers into one set of columns, tagging every row with its router.
+
+    :param results: dict of host to decoded json response, e.g. as returned by :func:`pyglinet.fleet.run`.
+        Exceptions in place of a response are skipped.
+    :param path: path to the records, see :func:`records`
+    :param host_column: name of the column holding the host
+    :param sep: separator of nested column names
+
+    :return: dict of column name to list of values
+    """
+    columns = {host_column: []}
+    length = 0
+    for host, data in results.items():
+        if isinstance(data, BaseException):
+            continue
+        part = flatten(records(data, path, sep), sep)
+        rows = len(part[next(iter(part))]) if part else 0
+        for name, values in part.items():
+            if name == host_column:
+                raise ValueError(f"Column {host_column} exists in the results, choose another host_column.")
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * length
+            column.extend(values)
+        columns[host_column].extend([host] * rows)
+        length += rows
+        _pad(columns, length)
+    return columns
+
+
+def _import(module: str, extra: str):
+    import importlib
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(f"Columnar export requires {module}. "
+                          f"Install it with: pip install python-glinet[{extra}]") from e
+
+
+def to_numpy(columns: Columns) -> dict:
+    """
+    Convert columns to NumPy arrays. Numeric columns with missing values become float arrays with nan, columns
+    holding lists, dicts or mixed types become object arrays.
+
+    :param columns: columns, see :func:`flatten`
+
+    :return: dict of column name to numpy.ndarray
+    """
+    np = _import("numpy", "numpy")
+    return {name: _to_array(np, values) for name, values in columns.items()}
+
+
+def _to_array(np, values: list):
+    types = set(map(type, values))
+    if not any(issubclass(t, (list, tuple, dict)) for t in types):
+        if type(None) in types and types - {type(None)} and types - {type(None)} <= {int, float}:
+            return np.array([np.nan if v is None else v for v in values], dtype=float)
+        return np.array(values)
+    # nested values must not be interpreted as further dimensions
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def to_pandas(columns: Columns):
+    """
+    Convert columns to a pandas DataFrame.
+
+    :param columns: columns, see :func:`flatten`
+
+    :return: pandas.DataFrame
+    """
+    pd = _import("pandas", "pandas")
+    return pd.DataFrame(columns)
+
+
+def to_arrow(columns: Columns):
+    """
+    Convert columns to an Arrow table. Column types are inferred by pyarrow.
+
+    :param columns: columns, see :func:`flatten`
+
+    :return: pyarrow.Table
+    """
+    pa = _import("pyarrow", "arrow")
+    return pa.table(columns)
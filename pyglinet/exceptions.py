@@ -36,3 +36,13 @@ class WrongApiDescriptionError(Exception):
 class UnsupportedHashAlgoError(Exception):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+
+
+class SchemaMismatchError(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,132 @@
+"""
+Helpers to run operations on many routers concurrently. Each router is represented by a logged in
+:class:`~pyglinet.GlInet` instance. Errors of single routers don't abort the others, they are returned in place of
+the result.
+"""
+import logging
+import pathlib
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Union, List, Dict, Callable, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pyglinet.glinet import GlInet
+
+log = logging.getLogger(__name__)
+
+
+def run(clients: List["GlInet"], func: Callable[["GlInet"], Any], max_workers: int = 8) -> Dict[str, Any]:
+    """
+    Call func for every client in a thread pool.
+
+    :param clients: logged in GlInet instances
+    :param func: function called with the client
+    :param max_workers: max number of routers processed at once
+
+    :return: dict of router url to result, or to the exception raised for this router
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, client): client for client in clients}
+        for future in as_completed(futures):
+            url = futures[future]._url
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                log.warning(f"Operation on {url} failed: {e!r}")
+                results[url] = e
+    return results
+
+
+def upload(clients: List["GlInet"],
+           file: Union[str, pathlib.Path],
+           path: str,
+           progress: Union[Callable[["GlInet", int, int], None], None] = None,
+           max_workers: int = 8,
+           **kwargs) -> Dict[str, Any]:
+    """
+    Stream a file, e.g. a firmware image, to many routers concurrently. See :meth:`~pyglinet.GlInet.upload`
+
+    :param clients: logged in GlInet instances
+    :param file: path to file, every upload reads the file independently
+    :param path: destination path on the routers
+    :param progress: callback called with (client, bytes sent, total bytes) after every chunk
+    :param max_workers: max number of concurrent uploads
+    :param kwargs: further parameters passed to :meth:`~pyglinet.GlInet.upload`
+
+    :return: dict of router url to upload response, or to the exception raised for this router
+    """
+    def _upload(client):
+        callback = (lambda sent, total: progress(client, sent, total)) if progress else None
+        return client.upload(file, path, progress=callback, **kwargs)
+
+    return run(clients, _upload, max_workers)
+
+
+def download(clients: List["GlInet"],
+             path: str,
+             dest: Union[str, Callable[["GlInet"], Union[str, pathlib.Path]]],
+             max_workers: int = 8,
+             **kwargs) -> Dict[str, Any]:
+    """
+    Stream a file, e.g. a backup, from many routers concurrently to disk. See :meth:`~pyglinet.GlInet.download`
+
+    :param clients: logged in GlInet instances
+    :param path: path of the file on the routers
+    :param dest: destination path containing the placeholder {host}, e.g. "backups/{host}.tar.gz", or function
+        returning the destination path for a client
+    :param max_workers: max number of concurrent downloads
+    :param kwargs: further parameters passed to :meth:`~pyglinet.GlInet.download`
+
+    :return: dict of router url to DownloadResult, or to the exception raised for this router
+    """
+    return run(clients, lambda client: client.download(path, _destination(client, dest), **kwargs), max_workers)
+
+
+def snapshot(clients: List["GlInet"],
+             dest: Union[str, Callable[["GlInet"], Union[str, pathlib.Path]]],
+             max_workers: int = 8,
+             **kwargs) -> Dict[str, Any]:
+    """
+    Take full state snapshots of many routers concurrently. See :meth:`~pyglinet.GlInet.snapshot`
+
+    :param clients: logged in GlInet instances
+    :param dest: archive path containing the placeholder {host}, e.g. "snapshots/{host}.jsonl.gz", or function
+        returning the archive path for a client
+    :param max_workers: max number of routers processed at once
+    :param kwargs: further parameters passed to :meth:`~pyglinet.GlInet.snapshot`
+
+    :return: dict of router url to snapshot summary, or to the exception raised for this router
+    """
+    return run(clients, lambda client: client.snapshot(_destination(client, dest), **kwargs), max_workers)
+
+
+def _destination(client, dest):
+    if callable(dest):
+        return dest(client)
+    return dest.format(host=urllib.parse.urlsplit(client._url).netloc.replace(":", "_"))
+
+
+def columns(clients: List["GlInet"],
+            params: List[str],
+            path: Union[str, None] = None,
+            host_column: str = "host",
+            max_workers: int = 8) -> Dict[str, list]:
+    """
+    Call an api method on many routers and concatenate the returned records to columns, e.g. the clients of all
+    routers. Every row is tagged with the host of its router. Routers raising an error are logged and left out.
+    Convert the result with :func:`pyglinet.columnar.to_pandas`, :func:`~pyglinet.columnar.to_numpy` or
+    :func:`~pyglinet.columnar.to_arrow`
+
+    :param clients: logged in GlInet instances
+    :param params: params of the call, e.g. ["clients", "get_list"]
+    :param path: path to the records in the result, see :func:`pyglinet.columnar.records`
+    :param host_column: name of the column holding the host
+    :param max_workers: max number of routers processed at once
+
+    :return: dict of column name to list of values
+    """
+    from pyglinet import columnar
+    results = run(clients, lambda client: client.request("call", params, raw=True), max_workers)
+    return columnar.concat({urllib.parse.urlsplit(url).netloc: result for url, result in results.items()},
+                           path, host_column)
@@ -1,9 +1,5 @@
 import time
 import os
-import requests
-from passlib.hash import md5_crypt as md5
-from passlib.hash import sha256_crypt as sha256
-from passlib.hash import sha512_crypt as sha512
 import getpass
 import hashlib
 import pyglinet.exceptions as exceptions
@@ -14,14 +10,37 @@ import threading
 import warnings
 from pyglinet import utils
 import pyglinet.glinet_api as api_helper
+from pyglinet.limiter import TokenBucket, AdaptiveConcurrencyLimiter
+from pyglinet.circuit_breaker import CircuitBreaker
+from pyglinet.session_store import SessionStore, dump_atomic
+from pyglinet.transport import Transport, create_transport
 import pathlib
 import pickle
-from typing import Union, List, Dict
-import shutil
+import json
+import urllib.parse
+from pyglinet import streaming
+from typing import Union, List, Dict, Callable, BinaryIO
 
 log = logging.getLogger(__name__)
 
 
+# heavy dependencies are imported on first use only to keep `import pyglinet` fast. The handlers are imported from
+# their modules, since the lazy passlib.hash proxy isn't thread safe on first access.
+def _md5_crypt(passwd, salt):
+    from passlib.handlers.md5_crypt import md5_crypt
+    return md5_crypt.hash(passwd, salt=salt)
+
+
+def _sha256_crypt(passwd, salt):
+    from passlib.handlers.sha2_crypt import sha256_crypt
+    return sha256_crypt.hash(passwd, salt=salt, rounds=5000)
+
+
+def _sha512_crypt(passwd, salt):
+    from passlib.handlers.sha2_crypt import sha512_crypt
+    return sha512_crypt.hash(passwd, salt=salt, rounds=5000)
+
+
 class GlInet:
     """
     This class manages the connection to a GL-Inet router and provides basic routines to send and receive data.
@@ -36,9 +55,9 @@ class GlInet:
     """
 
     _algo_map = {
-        "1": lambda passwd, salt: md5.hash(passwd, salt=salt),
-        "5": lambda passwd, salt: sha256.hash(passwd, salt=salt, rounds=5000),
-        "6": lambda passwd, salt: sha512.hash(passwd, salt=salt, rounds=5000)
+        "1": _md5_crypt,
+        "5": _sha256_crypt,
+        "6": _sha512_crypt
     }
 
     def __init__(self,
@@ -51,7 +70,17 @@ class GlInet:
                  verify_ssl_certificate: bool = False,
                  update_api_reference_cache: bool = False,
                  api_reference_url: str = "https://dev.gl-inet.cn/docs/api_docs_api/",
-                 cache_folder: str = None):
+                 cache_folder: str = None,
+                 compact_results: bool = False,
+                 rate_limit: Union[float, None] = None,
+                 rate_burst: Union[int, None] = None,
+                 max_concurrency: int = 1,
+                 request_timeout: Union[float, None] = 30,
+                 circuit_failure_threshold: int = 5,
+                 circuit_reset_timeout: float = 5,
+                 share_session: bool = False,
+                 transport: Union[str, Transport] = "requests",
+                 relogin: bool = True):
         """
         :param url: url to router rpc api
         :param username: username, default is root.
@@ -65,6 +94,26 @@ class GlInet:
             load data from cache.
         :param api_reference_url: url to api description
         :param cache_folder: folder where data is persisted. If left empty, default is `$home/.python-pyglinet`
+        :param compact_results: if True, api client calls return slotted records derived from the documented example
+            response instead of ResultContainer, whenever the response matches the documented shape. This
+            considerably reduces memory when holding many results.
+        :param rate_limit: max number of requests per second sent to the router, None for no limit
+        :param rate_burst: max number of requests sent at once before rate_limit applies, default is rate_limit
+        :param max_concurrency: upper bound of parallel requests to the router. The effective limit adapts between 1
+            and max_concurrency depending on observed latency and errors. See :attr:`~pyglinet.GlInet.limits`
+        :param request_timeout: timeout in seconds for connecting to and receiving data from the router, None to wait
+            forever
+        :param circuit_failure_threshold: number of consecutive connection failures after which requests fail
+            immediately with CircuitOpenError, until a probe request succeeds again
+        :param circuit_reset_timeout: seconds until the first probe request is sent after the circuit opened. The
+            interval is doubled after every failed probe.
+        :param share_session: if True, the session id is shared via the cache folder with all processes using the same
+            url and username. Only one process logs in, the others reuse its session. Logout ends the session for
+            all processes.
+        :param transport: transport for the rpc requests: "requests" (HTTP/1.1, default), "http2" to multiplex
+            concurrent requests on one HTTP/2 connection (requires httpx), or a :class:`~pyglinet.transport.Transport`
+        :param relogin: if True, an expired session is renewed by a single login, which all concurrent callers wait
+            for. Their requests are retried once with the new session id. No login takes place after logout().
         """
         self._url = url
         self._query_id = 0
@@ -81,12 +130,29 @@ class GlInet:
         self._password = password
         self._username = username
         self._protocol_version = protocol_version
+        import requests
         self._session = requests.session()
+        # keep one connection per concurrent request, the default pool of 10 discards and reopens connections beyond
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, max_concurrency))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._transport = create_transport(transport, self._session)
         self._sid = None
         self._keep_alive = keep_alive
         self._keep_alive_intervall = keep_alive_intervall
         self._thread = None
         self._lock = threading.Lock()
+        # serializes login attempts, _session_ready is cleared while the session is renewed
+        self._login_lock = threading.Lock()
+        self._session_ready = threading.Event()
+        self._session_ready.set()
+        self._relogin = relogin
+        self._rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit else None
+        self._concurrency_limiter = AdaptiveConcurrencyLimiter(max_limit=max_concurrency)
+        self._request_timeout = request_timeout
+        self._circuit_breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout)
+        self._recording = None
+        self._session_store = SessionStore(self._cache_folder, url, username) if share_session else None
         self._verify_ssl_certificate = verify_ssl_certificate
         if self._verify_ssl_certificate is False:
             log.warning("You disabled ssl certificate validation. Further warning messages will be deactivated.")
@@ -94,13 +160,37 @@ class GlInet:
         self._cached_login_data = None
         self._login_cache_path = os.path.join(self._cache_folder, "login.pkl")
         self._api_reference_cache_path = os.path.join(self._cache_folder, "api_reference.pkl")
+        self._api_search_index_cache_path = os.path.join(self._cache_folder, "api_search_index.pkl")
         self._api_reference_url = api_reference_url
+        self._api_reference_meta_cache_path = os.path.join(self._cache_folder, "api_reference_meta.pkl")
+        self._api_search_index = None
+        self._api_description = None
+        self._api_description_changes = None
+        # etag and hashes of the description held by this instance, the meta file may belong to a newer description
+        self._api_description_meta = None
         self._api_description = self.__load_api_description(update_api_reference_cache)
         self._api = None
+        self._compact_results = compact_results
         self._keep_alive_interrupt_event = threading.Event()
 
     def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release local resources: stop the keep alive thread and recording, close the transport and its connections.
+        The router session is not ended, call :meth:`~pyglinet.GlInet.logout` before to do so.
+
+        :return: None
+        """
         self._stop_keep_alive_thread()
+        # attributes may be missing if the constructor failed
+        if getattr(self, "_recording", None):
+            self.stop_recording()
+        if getattr(self, "_transport", None):
+            self._transport.close()
+        if getattr(self, "_session", None):
+            self._session.close()
 
     def __generate_query_id(self) -> int:
         """
@@ -108,8 +198,9 @@ class GlInet:
 
         :return: query id
         """
-        qid = self._query_id
-        self._query_id = (self._query_id + 1) % 9999999999
+        with self._lock:
+            qid = self._query_id
+            self._query_id = (self._query_id + 1) % 9999999999
         return qid
 
     def __generate_request(self, method: str, params: Union[Dict, List[str], str]) -> dict:
@@ -147,23 +238,50 @@ class GlInet:
                 "params": params
             }
 
-    def __request(self, method: str, params: Union[Dict, List[str], str]) -> utils.ResultContainer:
+    def __request(self, method: str, params: Union[Dict, List[str], str],
+                  raw: bool = False) -> Union[utils.ResultContainer, dict]:
         """
         Send request to router without considering the current login state. This may lead to misleading error messages.
 
         :param method: rpc method
         :param params: parameter
+        :param raw: if True, the decoded json is returned instead of a ResultContainer
 
         :return: ResultContainer
+
+        :raises CircuitOpenError: if the router was unreachable for several consecutive requests
         """
         req = self.__generate_request(method, params)
-        self._lock.acquire()
-        resp = self._session.post(self._url, json=req, verify=False)
-        self._lock.release()
+        self._circuit_breaker.before_request()
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+        # latencies differ a lot between methods, so the limiter compares them per method. The latency of session
+        # management calls, e.g. the alive check before every call, is dominated by client overhead and not sampled.
+        key = method if method != "call" else "/".join(str(p) for p in list(params)[:2])
+        sample = method not in ["challenge", "login", "logout", "alive"]
+        self._concurrency_limiter.acquire()
+        start = time.monotonic()
+        try:
+            resp = self._transport.post(self._url, req, self._request_timeout)
+        except Exception as e:
+            if self._transport.is_connection_error(e):
+                self._concurrency_limiter.release(None, success=False, key=key)
+                self._circuit_breaker.record_failure()
+            else:
+                # client side errors say nothing about the router and must not open the circuit
+                self._concurrency_limiter.cancel()
+                self._circuit_breaker.record_ignored()
+            raise
+        latency = time.monotonic() - start if sample else None
+        self._concurrency_limiter.release(latency, success=resp.status_code == 200, key=key)
+        self._circuit_breaker.record_success()
         if resp.status_code != 200:
             raise ConnectionError(f"Status code {resp.status_code} returned. Response content: \n\n {resp.content}")
-        if resp.json().get("error", None):
-            error_ = resp.json().get("error")
+        data = resp.json()
+        if self._recording and method not in ["challenge", "login", "logout", "alive"]:
+            self.__record(method, params, data)
+        if data.get("error", None):
+            error_ = data.get("error")
             if error_["code"] == -32000:
                 raise exceptions.AccessDeniedError(f"Access denied, error output: {error_}")
             elif error_["code"] == -32602:
@@ -172,51 +290,343 @@ class GlInet:
                 raise exceptions.MethodNotFoundError(
                     f"Wrong method {req.get('method', None)} in request, error output: {error_}")
             else:
-                raise ConnectionError(resp.json())
-        if resp.json().get("result", None) and resp.json().get("result", None).get("err_msg", None):
-            raise ConnectionError(resp.json())
-        return self.__create_object(resp.json(), method, params)
+                raise ConnectionError(data)
+        if isinstance(data.get("result", None), dict) and data["result"].get("err_msg", None):
+            raise ConnectionError(data)
+        if raw:
+            return data
+        return self.__create_object(data, method, params)
+
+    def start_recording(self, file: str) -> None:
+        """
+        Record all api calls and their responses to a file in json lines format, e.g. to replay them with the load
+        generator :mod:`pyglinet.loadgen`. Session management calls (challenge, login, logout, alive) are not
+        recorded, so the file contains neither the password hash nor the sid.
+
+        :param file: path to recording, new calls are appended
+
+        :return: None
+        """
+        self.stop_recording()
+        self._recording = open(file, "a", encoding="utf-8")
+
+    def stop_recording(self) -> None:
+        """
+        Stop recording started with :meth:`~pyglinet.GlInet.start_recording`
+
+        :return: None
+        """
+        if self._recording:
+            self._recording.close()
+            self._recording = None
+
+    def __record(self, method, params, data):
+        line = json.dumps({"method": method, "params": params, "response": data}) + "\n"
+        with self._lock:
+            if self._recording:
+                self._recording.write(line)
+                self._recording.flush()
 
     @decorators.login_required
-    def __request_with_sid(self, method: str, params: Union[Dict, List[str], str]) -> utils.ResultContainer:
+    def __request_with_sid(self, method: str, params: Union[Dict, List[str], str],
+                           raw: bool = False) -> Union[utils.ResultContainer, dict]:
         """
         Request which requires prior login
 
         :param method: api method call
         :param params: params
+        :param raw: if True, the decoded json is returned instead of a ResultContainer
 
         :return: ResultContainer
         """
-        return self.__request(method, params)
+        return self.__request(method, params, raw)
 
     @decorators.logout_required
-    def __request_without_sid(self, method: str, params: Union[Dict, List[str], str]) -> utils.ResultContainer:
+    def __request_without_sid(self, method: str, params: Union[Dict, List[str], str],
+                              raw: bool = False) -> Union[utils.ResultContainer, dict]:
         """
         Request which requires to be logged out
 
         :param method: api method call
         :param params: params
+        :param raw: if True, the decoded json is returned instead of a ResultContainer
 
         :return: ResultContainer
         """
-        return self.__request(method, params)
+        return self.__request(method, params, raw)
 
-    def request(self, method: str, params: Union[Dict, List[str], str]) -> utils.ResultContainer:
+    def request(self, method: str, params: Union[Dict, List[str], str],
+                raw: bool = False) -> Union[utils.ResultContainer, dict]:
         """
         Send request. Function checks if method requires login and chooses the respective request wrapper.
         see :meth:`~pyglinet.GlInet.__request_with_sid` and :meth:`~pyglinet.GlInet.__request`
 
         :param method: api method call
         :param params: params
+        :param raw: if True, the decoded json response is returned instead of a ResultContainer
 
         :return: ResultContainer
         """
         if method in ["challenge", "alive"]:
-            return self.__request(method, params)
+            return self.__request(method, params, raw)
         elif method in ["login"]:
-            return self.__request_without_sid(method, params)
+            return self.__request_without_sid(method, params, raw)
+        elif method in ["logout"]:
+            return self.__request_with_sid(method, params, raw)
         else:
-            return self.__request_with_sid(method, params)
+            return self.__with_session_recovery(self.__request_with_sid, method, params, raw)
+
+    def __with_session_recovery(self, func, *args):
+        """
+        Call request function and renew the session once if it expired in the meantime.
+        See :meth:`~pyglinet.GlInet.__renew_session`
+
+        :param func: request function
+        :param args: arguments passed to func
+
+        :return: result of func
+        """
+        if not self._relogin:
+            return func(*args)
+        # don't send requests with a sid which is just being replaced
+        self._session_ready.wait()
+        sid = self._sid
+        try:
+            return func(*args)
+        except (exceptions.NotLoggedInError, exceptions.AccessDeniedError):
+            if sid is None or not self.__renew_session(sid):
+                raise
+        log.debug(f"Retrying request with renewed session: {args}")
+        return func(*args)
+
+    def __renew_session(self, expired_sid: str) -> bool:
+        """
+        Login again if the given session id is still the current one and no longer alive. Only one thread logs in,
+        threads calling concurrently wait for it and find the renewed session afterwards.
+
+        :param expired_sid: session id which was used for the failed request
+
+        :return: True if the session id changed and the request should be retried, False if the session is still
+            alive, i.e. the error was not caused by the session
+
+        :raises NotLoggedInError: if logout() was called in the meantime
+        """
+        with self._login_lock:
+            if self._sid is None:
+                raise exceptions.NotLoggedInError("Session was closed by logout(). Call login() first!")
+            if self._sid != expired_sid:
+                return True
+            if self.is_alive():
+                return False
+            log.warning("Session expired, logging in again.")
+            self._session_ready.clear()
+            try:
+                self.__establish_session()
+            finally:
+                self._session_ready.set()
+            return True
+
+    @property
+    def limits(self) -> dict:
+        """
+        Current rate and concurrency limits for monitoring.
+
+        :return: dict with configured rate limit, available tokens, current and max concurrency limit, requests in
+            flight, number of requests waiting (queue_depth) and smoothed latency in seconds
+        """
+        limiter = self._concurrency_limiter
+        return {"rate_limit": self._rate_limiter.rate if self._rate_limiter else None,
+                "rate_burst": self._rate_limiter.burst if self._rate_limiter else None,
+                "tokens": self._rate_limiter.tokens if self._rate_limiter else None,
+                "concurrency_limit": int(limiter.limit),
+                "max_concurrency": limiter.max_limit,
+                "in_flight": limiter.in_flight,
+                "queue_depth": limiter.waiting + (self._rate_limiter.waiting if self._rate_limiter else 0),
+                "latency": limiter.latency}
+
+    @property
+    def circuit_state(self) -> str:
+        """
+        State of the circuit breaker for this router: closed, open or half_open.
+
+        :return: state
+        """
+        return self._circuit_breaker.state
+
+    def _api_getters(self) -> List[tuple]:
+        """
+        Enumerate getter calls (methods starting with get) from the api description.
+
+        :return: list of (rpc params, has required params) tuples, e.g. (["clients", "get_list"], False)
+        """
+        getters = []
+        for module in (self._api_description or {}).values():
+            for name, call in module.get("case_groups_data", {}).items():
+                title = call.get("data", {}).get("title", name)
+                if not re.match(r"get[_\-]", title):
+                    continue
+                required = any(not p.get("keyName", "").startswith("?") for p in call.get("params", []))
+                getters.append((list(call["module_name"]) + [title], required))
+        return getters
+
+    @decorators.login_required
+    def snapshot(self, file: Union[str, pathlib.Path], max_workers: int = 4,
+                 include_required_params: bool = False) -> dict:
+        """
+        Capture the full state of the router by calling every getter of the api description concurrently. Results
+        are written to a gzip compressed json lines file as they arrive: a header line followed by one line per call
+        with module, method, elapsed seconds and either the result or the error.
+
+        During the snapshot, max_workers replaces max_concurrency as upper bound of the adaptive concurrency limit,
+        which still backs off if the router is overloaded. To take snapshots of many routers see
+        :func:`pyglinet.fleet.snapshot`
+
+        :param file: path of the archive, e.g. snapshot.jsonl.gz
+        :param max_workers: max number of concurrent calls
+        :param include_required_params: if True, getters with required parameters are called without parameters too
+
+        :return: summary with number of calls, errors, skipped getters and duration
+        """
+        import gzip
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        getters = self._api_getters()
+        calls = [params for params, required in getters if include_required_params or not required]
+
+        def call(params):
+            start = time.monotonic()
+            try:
+                # login state was checked once for the whole snapshot, skip the alive check per call
+                result = self.__with_session_recovery(self.__request, "call", params, True).get("result")
+                return params, result, None, time.monotonic() - start
+            except Exception as e:
+                return params, None, repr(e), time.monotonic() - start
+
+        errors = 0
+        start = time.monotonic()
+        tmp = f"{file}.part"
+        try:
+            # max_workers bounds the snapshot, the adaptive limit starts there instead of at max_concurrency
+            with self._concurrency_limiter.expanded(max_workers), gzip.open(tmp, "wt", encoding="utf-8") as f:
+                f.write(json.dumps({"host": self._url, "time": time.time(), "calls": len(calls)}) + "\n")
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    for future in as_completed([executor.submit(call, params) for params in calls]):
+                        params, result, error, elapsed = future.result()
+                        entry = {"module": params[0], "method": params[1], "elapsed": elapsed}
+                        if error is None:
+                            entry["result"] = result
+                        else:
+                            entry["error"] = error
+                            errors += 1
+                        f.write(json.dumps(entry) + "\n")
+            os.replace(tmp, file)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        summary = {"file": str(file), "calls": len(calls), "errors": errors, "skipped": len(getters) - len(calls),
+                   "duration": time.monotonic() - start}
+        log.info(f"Snapshot of {self._url} written to {file}: {summary}")
+        return summary
+
+    @decorators.login_required
+    def upload(self,
+               file: Union[str, pathlib.Path, BinaryIO],
+               path: str,
+               progress: Union[Callable[[int, int], None], None] = None,
+               chunk_size: int = 2 ** 16,
+               upload_url: Union[str, None] = None) -> Union[dict, str]:
+        """
+        Stream a file, e.g. a firmware image or a backup, to the upload endpoint of the router. The file is read
+        chunk by chunk while it is sent, so memory usage doesn't depend on the file size.
+        To upload to many routers concurrently see :func:`pyglinet.fleet.upload`
+
+        :param file: path to file or binary file object. File objects are uploaded from their current position.
+        :param path: destination path on the router, e.g. /tmp/firmware.img
+        :param progress: callback called with (bytes sent, total bytes) after every chunk
+        :param chunk_size: max number of bytes read from file at once
+        :param upload_url: url of the upload endpoint, default is `upload` next to the rpc url
+
+        :return: decoded json response, or response text if it is no json
+        """
+        if isinstance(file, (str, pathlib.Path)):
+            with open(file, "rb") as f:
+                return self.__upload(f, os.path.basename(file), path, progress, chunk_size, upload_url)
+        return self.__upload(file, os.path.basename(getattr(file, "name", "file")) or "file", path, progress,
+                             chunk_size, upload_url)
+
+    def __upload(self, file, filename, path, progress, chunk_size, upload_url):
+        size = streaming.file_size(file)
+        body = streaming.MultipartStream({"sid": self._sid, "size": size, "path": path}, "file", file, filename, size,
+                                         progress, chunk_size)
+        upload_url = upload_url or urllib.parse.urljoin(self._url, "upload")
+        log.info(f"Uploading {filename} ({size} bytes) to {upload_url}")
+        resp = self.__post_stream(upload_url, data=body, headers={"Content-Type": body.content_type})
+        try:
+            return resp.json()
+        except ValueError:
+            return resp.text
+
+    @decorators.login_required
+    def download(self,
+                 path: str,
+                 dest: Union[str, pathlib.Path, BinaryIO],
+                 compress: Union[str, None] = None,
+                 checksum: Union[str, None] = "sha256",
+                 progress: Union[Callable[[int], None], None] = None,
+                 chunk_size: int = 2 ** 16,
+                 download_url: Union[str, None] = None) -> streaming.DownloadResult:
+        """
+        Stream a file, e.g. a backup or a log, from the download endpoint of the router to disk. The response is
+        written chunk by chunk, so memory usage doesn't depend on the file size.
+        To download from many routers concurrently see :func:`pyglinet.fleet.download`
+
+        :param path: path of the file on the router
+        :param dest: destination path or binary file object. A destination path is only replaced once the download
+            completed.
+        :param compress: None or "gzip" to compress the data while writing
+        :param checksum: name of a hashlib algorithm to compute of the downloaded data, None to skip
+        :param progress: callback called with the number of bytes received after every chunk
+        :param chunk_size: max number of bytes read at once
+        :param download_url: url of the download endpoint, default is `download` next to the rpc url
+
+        :return: DownloadResult with bytes received, bytes written and checksum
+        """
+        download_url = download_url or urllib.parse.urljoin(self._url, "download")
+        log.info(f"Downloading {path} from {download_url}")
+        resp = self.__post_stream(download_url, data={"sid": self._sid, "path": path}, stream=True)
+        with resp:
+            chunks = resp.iter_content(chunk_size)
+            if not isinstance(dest, (str, pathlib.Path)):
+                return streaming.write_chunks(chunks, dest, compress, checksum, progress)
+            tmp = f"{dest}.part"
+            try:
+                with open(tmp, "wb") as f:
+                    result = streaming.write_chunks(chunks, f, compress, checksum, progress)
+                os.replace(tmp, dest)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            return result
+
+    def __post_stream(self, url: str, **kwargs):
+        """
+        Post to an endpoint besides the rpc api, guarded by the circuit breaker.
+
+        :param url: url
+        :param kwargs: arguments passed to requests
+
+        :return: response
+        """
+        self._circuit_breaker.before_request()
+        try:
+            resp = self._session.post(url, verify=False, timeout=self._request_timeout, **kwargs)
+        except Exception:
+            self._circuit_breaker.record_failure()
+            raise
+        self._circuit_breaker.record_success()
+        if resp.status_code != 200:
+            resp.close()
+            raise ConnectionError(f"Status code {resp.status_code} returned from {url}.")
+        return resp
 
     def __create_object(self, json_data, method, params):
         """
@@ -256,10 +666,55 @@ class GlInet:
         :return: GlInet
         """
 
+        with self._login_lock:
+            if self.is_alive():
+                log.info("Already logged in, nothing to do.")
+                return self
+            self.__establish_session()
+
+        # start keep alive thread
+        if self._keep_alive:
+            self._start_keep_alive_thread()
+        return self
+
+    def __establish_session(self) -> None:
+        """
+        Login, or adopt the shared session if enabled. Must be called with _login_lock held.
+
+        :return: None
+        """
+        if self._session_store:
+            # only the process holding the lock logs in, the others reuse the session afterwards
+            with self._session_store.lock():
+                if not self.__adopt_shared_session():
+                    self.__login()
+                    self._session_store.save(self._sid)
+        else:
+            self.__login()
+
+    def __adopt_shared_session(self) -> bool:
+        """
+        Use session id of the shared session store if it is alive.
+
+        :return: True if the shared session was adopted
+        """
+        sid = self._session_store.load()
+        if sid is None or sid == self._sid:
+            return False
+        self._sid = sid
         if self.is_alive():
-            log.info("Already logged in, nothing to do.")
-            return self
+            log.info("Reusing shared session.")
+            self._session.cookies.set("Admin-Token", sid)
+            return True
+        self._sid = None
+        return False
+
+    def __login(self) -> None:
+        """
+        Run challenge-response login sequence and set session id.
 
+        :return: None
+        """
         challenge = self.__challenge_login()
         if self._password is None:
             self._cached_login_data = self.__load_if_exist(self._login_cache_path)
@@ -282,11 +737,6 @@ class GlInet:
             os.remove(self._login_cache_path)
             raise
 
-        # start keep alive thread
-        if self._keep_alive:
-            self._start_keep_alive_thread()
-        return self
-
     @decorators.login_required
     def _start_keep_alive_thread(self):
         """
@@ -353,7 +803,7 @@ class GlInet:
 
     def __dump_to_file(self, obj, file):
         """
-        Dump pickle data to file.
+        Dump pickle data to file atomically.
 
         :param obj: object to dump
         :param file: path to file
@@ -362,9 +812,8 @@ class GlInet:
         """
         if not pathlib.Path(file).parent.exists():
             pathlib.Path(file).parent.mkdir(exist_ok=True)
-
-        with open(file, "wb") as f:
-            pickle.dump(obj, f)
+        # write to temporary file and move it in place, such that concurrent processes never read partial data
+        dump_atomic(obj, file)
 
     def __keep_alive(self) -> None:
         """
@@ -378,9 +827,20 @@ class GlInet:
         log.info(f"Starting keep alive thread at intvervall {self._keep_alive_intervall}")
         while self._keep_alive and not self._keep_alive_interrupt_event.is_set():
             log.debug(f"keep alive with intervall {self._keep_alive_intervall}")
-            if not self.is_alive():
-                log.warning("client disconnected, trying to login again..")
-                self.login()
+            try:
+                sid = self._sid
+                if sid is None:
+                    break
+                if not self.is_alive():
+                    log.warning("client disconnected, trying to login again..")
+                    # same path as user requests, so only one of them logs in
+                    self.__renew_session(sid)
+            except exceptions.NotLoggedInError:
+                break
+            except exceptions.CircuitOpenError as e:
+                log.debug(f"Router unreachable, skipping keep alive: {e}")
+            except (ConnectionError, OSError) as e:
+                log.warning(f"Keep alive failed, retrying in {self._keep_alive_intervall} seconds: {e}")
             self._keep_alive_interrupt_event.wait(self._keep_alive_intervall)
         log.info("Keep alive halted.")
 
@@ -392,6 +852,7 @@ class GlInet:
         :return: None
         """
         if os.path.exists(self._cache_folder):
+            import shutil
             shutil.rmtree(self._cache_folder)
         self._cached_login_data = None
         log.info(f"Login cache cleared and folder {self._cache_folder} deleted")
@@ -416,10 +877,15 @@ class GlInet:
 
         :return: True
         """
-        if self.is_alive():
-            self.request("logout", {"sid": self._sid})
-        self._session.cookies.clear()
-        self._sid = None
+        # hold the login lock, such that a concurrent session renewal can't revive the session
+        with self._login_lock:
+            if self.is_alive():
+                self.request("logout", {"sid": self._sid})
+            if self._session_store and self._sid:
+                self._session_store.clear(self._sid)
+            self._session.cookies.clear()
+            self._transport.clear_cookies()
+            self._sid = None
         self._stop_keep_alive_thread()
         return True
 
@@ -458,31 +924,112 @@ class GlInet:
         """
         api_description = None
         if update or not os.path.exists(self._api_reference_cache_path):
-            log.info(f"Loading api description from {self._api_reference_url}")
-            resp = requests.get(self._api_reference_url)
-            api_description = resp.json()["data"]
-            api_description = {utils.sanitize_string(i["module_name"][0]): i for i in api_description}
-            pathlib.Path(self._cache_folder).mkdir(exist_ok=True)
-            with open(self._api_reference_cache_path, "wb") as f:
-                log.info(f"Updating cache file {self._api_reference_cache_path}")
-                pickle.dump(api_description, f)
+            api_description, self._api_description_meta, self._api_description_changes = \
+                self.__fetch_api_description()
         else:
             with open(self._api_reference_cache_path, "rb") as f:
                 api_description = pickle.load(f)
+            self._api_description_meta = self.__load_if_exist(self._api_reference_meta_cache_path) or {}
 
         return api_description
 
+    def __fetch_api_description(self):
+        """
+        Fetch api description from the web. If a cached description exists, the request is conditional
+        (ETag/Last-Modified) and the description is only parsed and persisted if its content hash changed.
+
+        :return: (api description, its meta data, names of changed modules). Changed modules is None if there is no
+            previous description to compare with.
+        """
+        import requests
+        previous = self._api_description
+        # the cache may have been refreshed by another instance sharing the cache folder, so the description held by
+        # this instance is compared with its own meta. The meta on disk only belongs to the description on disk.
+        meta = self._api_description_meta or {}
+        from_disk = previous is None and os.path.exists(self._api_reference_cache_path)
+        if from_disk:
+            previous = self.__load_if_exist(self._api_reference_cache_path)
+            meta = self.__load_if_exist(self._api_reference_meta_cache_path) or {}
+        headers = {}
+        if previous is not None and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if previous is not None and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        log.info(f"Loading api description from {self._api_reference_url}")
+        resp = requests.get(self._api_reference_url, headers=headers, timeout=self._request_timeout)
+        if resp.status_code == 304 and previous is not None:
+            log.info("Api description not modified.")
+            return previous, meta, set()
+        resp.raise_for_status()
+        content_hash = hashlib.sha256(resp.content).hexdigest()
+        new_meta = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified"),
+                    "content_hash": content_hash, "module_hashes": meta.get("module_hashes", {})}
+        if previous is not None and content_hash == meta.get("content_hash"):
+            log.info("Api description content unchanged.")
+            if from_disk:
+                self.__dump_to_file(new_meta, self._api_reference_meta_cache_path)
+            return previous, new_meta, set()
+
+        api_description = resp.json()["data"]
+        api_description = {utils.sanitize_string(i["module_name"][0]): i for i in api_description}
+        new_meta["module_hashes"] = {name: hashlib.sha256(json.dumps(module, sort_keys=True).encode()).hexdigest()
+                                     for name, module in api_description.items()}
+        changes = None
+        if previous is not None and meta.get("module_hashes"):
+            changes = {name for name, module_hash in new_meta["module_hashes"].items()
+                       if meta["module_hashes"].get(name) != module_hash}
+            log.info(f"Api description of modules {sorted(changes)} changed.")
+        log.info(f"Updating cache file {self._api_reference_cache_path}")
+        self.__dump_to_file(api_description, self._api_reference_cache_path)
+        self.__dump_to_file(new_meta, self._api_reference_meta_cache_path)
+        self._api_search_index = self.__build_api_search_index(api_description)
+        return api_description, new_meta, changes
+
+    def __build_api_search_index(self, api_description) -> api_helper.GlInetApiIndex:
+        """
+        Build search index from api description and persist it next to the cached api description.
+
+        :param api_description: api description
+
+        :return: GlInetApiIndex
+        """
+        log.info(f"Updating search index cache file {self._api_search_index_cache_path}")
+        index = api_helper.GlInetApiIndex(api_description)
+        self.__dump_to_file(index, self._api_search_index_cache_path)
+        return index
+
+    @property
+    def api_search_index(self) -> api_helper.GlInetApiIndex:
+        """
+        Search index over the api description. The index is loaded from cache and only built if no cached index
+        exists. See :meth:`~pyglinet.glinet_api.GlInetApi.search`
+
+        :return: GlInetApiIndex
+        """
+        if self._api_search_index is None:
+            self._api_search_index = self.__load_if_exist(self._api_search_index_cache_path)
+            if not isinstance(self._api_search_index, api_helper.GlInetApiIndex):
+                self._api_search_index = self.__build_api_search_index(self._api_description)
+        return self._api_search_index
+
     @decorators.login_required
     def get_api_client(self, update_description=False) -> api_helper.GlInetApi:
         """
         Create GlInetApi object client to access api functions
 
-        :param update_description: if True, api description is updated from web
+        :param update_description: if True, api description is updated from web. The request is conditional and only
+            the api calls of changed modules are regenerated.
         :return: GlInetApi
         """
         if not self._api_description or update_description:
             self._api_description = self.__load_api_description(True)
-            self._api = api_helper.GlInetApi(self._api_description, self)
+            # only regenerate api calls of modules whose description changed
+            if self._api is not None and self._api_description_changes is not None:
+                self._api = api_helper.GlInetApi(self._api_description, self, previous=self._api,
+                                                 changed_modules=self._api_description_changes)
+            else:
+                self._api = api_helper.GlInetApi(self._api_description, self)
         if not self._api:
             self._api = api_helper.GlInetApi(self._api_description, self)
 
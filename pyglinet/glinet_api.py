@@ -1,14 +1,17 @@
-from tabulate import tabulate
 import pyglinet.decorators as decorators
-import requests
 import pyglinet.exceptions as exceptions
-from typing import Union, List, Dict
+from typing import Union, List, Dict, TYPE_CHECKING
 import json
 import codecs
 import logging
+import bisect
+from pyglinet import utils
 
 log = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    import requests
+
 
 class GlInetApiCall:
     def __init__(self, data: dict, session):
@@ -28,6 +31,8 @@ class GlInetApiCall:
                 log.debug(f"Could not json decode strings. Writing using now raw ones. {self.in_example}\n{self.out_example}")
                 in_example = self.in_example
                 out_example = self.out_example
+        self._out_example = out_example
+        self._record_schema = None
         self.__doc__ = f"\nAvailable parameters (?=optional):\n" + self.__repr__() + f"\n\nExample request:\n{in_example}\n\n" + f"\n\nExample response:\n{out_example}\n"
 
     def _wrap(self, value):
@@ -44,9 +49,35 @@ class GlInetApiCall:
         elif params and isinstance(params, list):
             p = params
         p = self.module_name + [self.data.title] + p
+        if getattr(self._session, "_compact_results", False):
+            return self._to_compact_result(self._session.request("call", p, raw=True).get("result", None))
         return self._session.request("call", p).result
 
+    @property
+    def _typename(self) -> str:
+        return utils.sanitize_string(f"{self.module_name[0]}__{self.data.title}")
+
+    def _to_compact_result(self, result):
+        """
+        Convert result into records generated from the documented example response. The record classes are
+        derived once per api call. If the result doesn't match the documented shape, a ResultContainer is returned.
+
+        :param result: json decoded result
+
+        :return: records or ResultContainer
+        """
+        if self._record_schema is None:
+            example = self._out_example.get("result", None) if isinstance(self._out_example, dict) else None
+            self._record_schema = utils.record_schema(self._typename, example) or False
+        if self._record_schema:
+            try:
+                return utils.to_record(self._record_schema, result)
+            except exceptions.SchemaMismatchError as e:
+                log.debug(f"Result doesn't match documented response of {self._typename}: {e}")
+        return utils.ResultContainer(self._typename, {"result": result}).result
+
     def __repr__(self):
+        from tabulate import tabulate
         return tabulate([[i.keyName, i.dataType__name, i.desp] for i in self.params],
                         headers=["Parameter", "Type", "Description"])
 
@@ -72,22 +103,124 @@ class GlInetApiProperty:
         return str(self.__dict__)
 
 
+class GlInetApiIndex:
+    """
+    Inverted index over the api description. Module names, method titles, parameter names and descriptions are
+    tokenized once, such that queries only need dictionary lookups.
+    """
+
+    _weights = {"module": 3.0, "method": 3.0, "parameter": 2.0, "description": 1.0}
+
+    def __init__(self, data: dict):
+        """
+        :param data: api description as loaded by :class:`~pyglinet.GlInet`
+        """
+        self._postings = {}
+        for module, module_data in data.items():
+            if not isinstance(module_data, dict):
+                continue
+            for method, method_data in module_data.get("case_groups_data", {}).items():
+                key = (module, method)
+                self._add(key, "module", module)
+                self._add(key, "method", method)
+                self._add(key, "description", method_data.get("data", {}).get("desp", ""))
+                for param in method_data.get("params", []):
+                    self._add(key, "parameter", param.get("keyName", "").lstrip("?"))
+                    self._add(key, "description", param.get("desp", ""))
+        self._vocabulary = sorted(self._postings)
+
+    def _add(self, key, field, text):
+        for token in utils.tokenize(text):
+            scores = self._postings.setdefault(token, {})
+            scores[key] = scores.get(key, 0) + self._weights[field]
+
+    def _matching_terms(self, token):
+        """
+        Yield all terms starting with token together with a weight. Exact matches count fully, prefix matches half.
+        """
+        i = bisect.bisect_left(self._vocabulary, token)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(token):
+            term = self._vocabulary[i]
+            yield term, 1.0 if term == token else 0.5
+            i += 1
+
+    def search(self, query: str, limit: Union[int, None] = 10) -> List[tuple]:
+        """
+        Search the index.
+
+        :param query: whitespace separated search terms
+        :param limit: max number of results, None for all
+
+        :return: list of (module, method) tuples, best match first
+        """
+        tokens = set(utils.tokenize(query))
+        hits = {}
+        for token in tokens:
+            matches = {}
+            for term, weight in self._matching_terms(token):
+                for key, score in self._postings[term].items():
+                    matches[key] = max(matches.get(key, 0), score * weight)
+            for key, score in matches.items():
+                covered, total = hits.get(key, (0, 0))
+                hits[key] = (covered + 1, total + score)
+        ranked = sorted(hits, key=lambda k: (-hits[k][0], -hits[k][1], k))
+        return ranked[:limit] if limit is not None else ranked
+
+    def __len__(self):
+        return len(self._vocabulary)
+
+
 class GlInetApi:
-    def __init__(self, data: dict, session: requests.Session):
+    def __init__(self, data: dict, session: "requests.Session", previous: Union["GlInetApi", None] = None,
+                 changed_modules: Union[set, None] = None):
+        """
+        :param data: api description
+        :param session: GlInet session
+        :param previous: api client of a previous description. Modules not in changed_modules are taken over from it
+            instead of being regenerated.
+        :param changed_modules: names of the modules whose description changed since previous
+        """
         self._session = session
         if isinstance(data, dict) and data.get("case_groups_data", None):
             for name, value in data.get("case_groups_data").items():
                 setattr(self, name, GlInetApiCall(value, self._session))
         elif isinstance(data, dict):
+            changed_modules = changed_modules if changed_modules is not None else set(data)
             for name, value in data.items():
-                setattr(self, name, self._wrap(value))
+                unchanged = getattr(previous, name, None) if name not in changed_modules else None
+                if isinstance(unchanged, GlInetApi):
+                    setattr(self, name, unchanged)
+                else:
+                    setattr(self, name, self._wrap(value))
         else:
             raise exceptions.WrongApiDescriptionError(f"Api description has no valid format:\n {data}")
 
     def _wrap(self, value):
         return GlInetApi(value, self._session)
 
+    def search(self, query: str, limit: Union[int, None] = 10) -> List[GlInetApiCall]:
+        """
+        Search api calls by module name, method name, parameter names and descriptions.
+        The search index is built once and persisted together with the api description cache.
+
+        e.g. ``api.search("wifi channel")``
+
+        :param query: whitespace separated search terms, prefixes are matched as well
+        :param limit: max number of results, None for all
+
+        :return: list of GlInetApiCall, best match first
+        """
+        calls = []
+        for module, method in self._session.api_search_index.search(query, None):
+            call = getattr(getattr(self, module, None), method, None)
+            if isinstance(call, GlInetApiCall):
+                calls.append(call)
+            if limit is not None and len(calls) >= limit:
+                break
+        return calls
+
     def __repr__(self):
+        from tabulate import tabulate
         return tabulate([[i] for i in list(self.__dict__.keys()) if not i.startswith("_")], headers=["Function"])
 
     def __str__(self):
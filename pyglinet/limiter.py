@@ -0,0 +1,229 @@
+import threading
+import time
+import contextlib
+import collections
+import logging
+from typing import Union
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter. Tokens are refilled continuously at `rate` tokens per second up to `burst` tokens.
+    Each request consumes one token and blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: Union[int, None] = None):
+        """
+        :param rate: sustained number of requests per second
+        :param burst: max number of requests which can be sent at once, default is max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    @property
+    def tokens(self) -> float:
+        """
+        Currently available tokens
+        """
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def acquire(self) -> None:
+        """
+        Take one token, block until it is available.
+        """
+        with self._lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limiter adapting the number of parallel requests with AIMD (additive increase, multiplicative
+    decrease). Like TCP slow start, the limit doubles per round trip until the first overload. Afterwards it grows by
+    one per round trip while latencies stay close to the lowest latency observed and
+    is cut by `backoff` on errors or when latency exceeds `latency_tolerance` times the lowest latency and the lowest
+    latency plus `latency_floor`.
+
+    Latencies are compared per key, e.g. per rpc method, since a cheap alive check and an expensive call differ by
+    far more than the tolerance. The lowest latency of a key slowly follows higher samples, such that a single fast
+    outlier doesn't mark all later requests as overload.
+    """
+
+    def __init__(self,
+                 max_limit: int = 1,
+                 min_limit: int = 1,
+                 latency_tolerance: float = 2.0,
+                 backoff: float = 0.5,
+                 smoothing: float = 0.2,
+                 baseline_drift: float = 0.01,
+                 latency_floor: float = 0.01):
+        """
+        :param max_limit: upper bound of concurrent requests
+        :param min_limit: lower bound of concurrent requests
+        :param latency_tolerance: latency above latency_tolerance * lowest observed latency is treated as overload
+        :param backoff: factor the limit is multiplied with on overload
+        :param smoothing: weight of the latest sample in the exponentially smoothed latency
+        :param baseline_drift: fraction of the difference by which the lowest latency moves towards a higher sample,
+            0 keeps the lowest latency ever observed
+        :param latency_floor: latency increase in seconds which is never treated as overload. Covers the jitter of
+            requests taking only a few milliseconds.
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(f"Limits must satisfy 1 <= min_limit <= max_limit, got {min_limit}, {max_limit}")
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.baseline_drift = baseline_drift
+        self.latency_floor = latency_floor
+        self.limit = float(min_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency = None
+        # key -> [smoothed latency, lowest latency]
+        self._baselines = {}
+        self._last_decrease = float("-inf")
+        self._slow_start = True
+        self._expansions = []
+        self._configured_max_limit = max_limit
+        # waiting requests in arrival order, a released slot is handed to the oldest one
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """
+        Block until the number of requests in flight is below the current limit. Slots are granted in arrival
+        order, such that a thread releasing and acquiring again can't overtake waiting threads.
+        """
+        with self._condition:
+            if not self._queue and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            ticket = [False]
+            self._queue.append(ticket)
+            self.waiting += 1
+            try:
+                while not ticket[0]:
+                    self._condition.wait()
+            except BaseException:
+                if ticket[0]:
+                    self.in_flight -= 1
+                else:
+                    self._queue.remove(ticket)
+                self._grant()
+                raise
+            finally:
+                self.waiting -= 1
+
+    def _grant(self) -> None:
+        # must be called with _condition held
+        granted = False
+        while self._queue and self.in_flight < int(self.limit):
+            self._queue.popleft()[0] = True
+            self.in_flight += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def expanded(self, max_limit: int):
+        """
+        Temporarily raise the upper bound to max_limit and start the limit there, e.g. for a batch of independent
+        calls. The limit still decreases on overload. Afterwards the previous upper bound applies again.
+
+        :param max_limit: upper bound of concurrent requests within the context
+        """
+        with self._condition:
+            if not self._expansions:
+                self._configured_max_limit = self.max_limit
+            self._expansions.append(max_limit)
+            self.max_limit = max(self.max_limit, max_limit)
+            self.limit = max(self.limit, float(max_limit))
+            self._grant()
+        try:
+            yield self
+        finally:
+            with self._condition:
+                self._expansions.remove(max_limit)
+                self.max_limit = max([self._configured_max_limit] + self._expansions)
+                self.limit = min(self.limit, float(self.max_limit))
+
+    @property
+    def min_latency(self) -> Union[float, None]:
+        """
+        Lowest latency of all keys, for monitoring.
+        """
+        with self._condition:
+            return min((b[1] for b in self._baselines.values()), default=None)
+
+    def release(self, latency: Union[float, None], success: bool = True, key=None) -> None:
+        """
+        Release slot and adapt limit.
+
+        :param latency: latency of the finished request in seconds, None to not use the request as latency sample
+        :param success: False if the request failed due to connection errors or server errors
+        :param key: requests with the same key are expected to have similar latency, e.g. the rpc method
+        """
+        with self._condition:
+            self.in_flight -= 1
+            baseline = self._baselines.get(key)
+            if success and latency is not None:
+                self.latency = latency if self.latency is None else \
+                    self.smoothing * latency + (1 - self.smoothing) * self.latency
+                if baseline is None:
+                    baseline = self._baselines[key] = [latency, latency]
+                else:
+                    baseline[0] = self.smoothing * latency + (1 - self.smoothing) * baseline[0]
+                    baseline[1] = latency if latency < baseline[1] else \
+                        baseline[1] + self.baseline_drift * (latency - baseline[1])
+            overloaded = not success or (latency is not None and baseline is not None and
+                                         baseline[0] > max(self.latency_tolerance * baseline[1],
+                                                           baseline[1] + self.latency_floor))
+            if overloaded:
+                # decrease at most once per round trip, requests started before the last decrease see the old load
+                now = time.monotonic()
+                if now - self._last_decrease >= (baseline[0] if baseline else self.latency or 0):
+                    self._last_decrease = now
+                    self._slow_start = False
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    log.debug(f"Decreasing concurrency limit to {int(self.limit)}")
+            else:
+                # one success per request in flight, i.e. slow start doubles the limit per round trip
+                self.limit = min(self.max_limit, self.limit + (1 if self._slow_start else 1 / self.limit))
+            self._grant()
+
+    def cancel(self) -> None:
+        """
+        Release slot of a request that failed on the client side, e.g. due to invalid parameters, without adapting the
+        limit.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._grant()
@@ -0,0 +1,434 @@
+"""
+Load generator replaying recorded api traffic with many virtual sessions against a local stub router.
+
+Traffic can be recorded with :meth:`~pyglinet.GlInet.start_recording` or taken from the vcr cassettes in
+``tests/cassettes``. Every virtual session is a separate :class:`~pyglinet.GlInet` instance which logs in to the
+stub router and replays the recorded calls. The stub router runs in a separate process by default, such that the
+reported cpu time and memory are the ones of the client library.
+
+Usage: python -m pyglinet.loadgen recording.jsonl --sessions 50 --iterations 10 --arrival-rate 20 --think-time 0.1
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import random
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Union, List, Dict
+
+log = logging.getLogger(__name__)
+
+SESSION_METHODS = ["challenge", "login", "logout", "alive"]
+
+
+def _request_key(method, params) -> str:
+    return json.dumps([method, params], sort_keys=True)
+
+
+def load_recording(file: str) -> List[Dict]:
+    """
+    Load recorded traffic. Supported are files written by :meth:`~pyglinet.GlInet.start_recording` (json lines)
+    and vcr cassettes (yaml, requires PyYAML). Session management calls (challenge, login, logout, alive) are skipped,
+    since every virtual session issues them itself.
+
+    :param file: path to recording
+
+    :return: list of dicts with method, params (without sid) and response
+    """
+    if file.endswith((".yaml", ".yml")):
+        return _load_cassette(file)
+    recording = []
+    with open(file, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                recording.append(json.loads(line))
+    return recording
+
+
+def _load_cassette(file: str) -> List[Dict]:
+    import yaml
+    with open(file, "r", encoding="utf-8") as f:
+        cassette = yaml.safe_load(f)
+    recording = []
+    for interaction in cassette.get("interactions", []):
+        request, response = interaction["request"], interaction["response"]
+        if not request["uri"].endswith("/rpc") or not request.get("body"):
+            continue
+        body = json.loads(request["body"])
+        if body["method"] in SESSION_METHODS:
+            continue
+        params = body.get("params")
+        # calls in cassettes are always sent with sid
+        if isinstance(params, list):
+            params = params[1:]
+        elif isinstance(params, dict):
+            params = {k: v for k, v in params.items() if k != "sid"}
+        try:
+            recording.append({"method": body["method"], "params": params,
+                              "response": json.loads(response["body"]["string"])})
+        except (ValueError, KeyError, TypeError):
+            log.debug(f"Skipping interaction without json response: {request['body']}")
+    return recording
+
+
+class StubRpc:
+    """
+    Json-rpc logic of the stub routers. Session management calls are emulated, any password is accepted. All other
+    calls are answered with the recorded response of the same method and params.
+    """
+
+    def __init__(self, recording: List[Dict], delay: float = 0):
+        """
+        :param recording: recorded traffic, see :func:`load_recording`
+        :param delay: seconds every request is delayed to emulate the processing time of the router
+        """
+        self.responses = {_request_key(r["method"], r["params"]): r["response"] for r in recording}
+        self.delay = delay
+        self.sids = set()
+        self.sids_lock = threading.Lock()
+        self.connections = 0
+
+    def dispatch(self, request: dict) -> dict:
+        method, params = request.get("method"), request.get("params")
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        if method == "challenge":
+            response["result"] = {"salt": "glinet00", "alg": 1, "nonce": secrets.token_hex(16)}
+        elif method == "login":
+            sid = secrets.token_urlsafe(24)
+            with self.sids_lock:
+                self.sids.add(sid)
+            response["result"] = {"sid": sid, "username": params.get("username")}
+        elif method in ["alive", "logout"]:
+            with self.sids_lock:
+                valid = params.get("sid") in self.sids
+                if valid and method == "logout":
+                    self.sids.discard(params.get("sid"))
+            if valid:
+                response["result"] = None
+            else:
+                response["error"] = {"code": -32000, "message": "Access denied"}
+        else:
+            with self.sids_lock:
+                if isinstance(params, list) and params and params[0] in self.sids:
+                    params = params[1:]
+                elif isinstance(params, dict) and params.get("sid") in self.sids:
+                    params = {k: v for k, v in params.items() if k != "sid"}
+                else:
+                    return dict(response, error={"code": -32000, "message": "Access denied"})
+            recorded = self.responses.get(_request_key(method, params))
+            if recorded is None:
+                return dict(response, error={"code": -32601, "message": "Method not found"})
+            response = dict(recorded, id=request.get("id"))
+        return response
+
+
+class StubRouter(ThreadingMixIn, HTTPServer, StubRpc):
+    """
+    HTTP/1.1 stub router, every connection is handled in its own thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, recording: List[Dict], address: tuple = ("127.0.0.1", 0), delay: float = 0):
+        """
+        :param recording: recorded traffic, see :func:`load_recording`
+        :param address: (host, port) to listen on, port 0 selects a free port
+        :param delay: seconds every request is delayed to emulate the processing time of the router
+        """
+        StubRpc.__init__(self, recording, delay)
+        HTTPServer.__init__(self, address, _StubRouterHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/rpc"
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class _StubRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        data = json.dumps(self.server.dispatch(json.loads(body))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Http2StubRouter(StubRpc):
+    """
+    HTTP/2 stub router (prior knowledge, unencrypted) multiplexing all requests of a connection in an asyncio event
+    loop. Requires the h2 package, which is installed with ``pip install python-glinet[http2]``.
+    """
+
+    def __init__(self, recording: List[Dict], address: tuple = ("127.0.0.1", 0), delay: float = 0):
+        """
+        :param recording: recorded traffic, see :func:`load_recording`
+        :param address: (host, port) to listen on, port 0 selects a free port
+        :param delay: seconds every request is delayed to emulate the processing time of the router
+        """
+        import h2  # noqa: F401, fail early if h2 is missing
+        super().__init__(recording, delay)
+        self.server_address = address
+        self._loop = None
+        self._server = None
+        self._connections = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/rpc"
+
+    def serve_forever(self) -> None:
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_forever()
+
+    def start(self) -> "Http2StubRouter":
+        """
+        Start serving in a background thread.
+
+        :return: Http2StubRouter
+        """
+        import asyncio
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        while self._loop is None or not self._loop.is_running():
+            time.sleep(0.001)
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle, *self.server_address), self._loop).result()
+        self.server_address = self._server.sockets[0].getsockname()[:2]
+        return self
+
+    def shutdown(self) -> None:
+        import asyncio
+
+        async def stop():
+            self._server.close()
+            for writer, task in list(self._connections.items()):
+                writer.close()
+                await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _handle(self, reader, writer):
+        import asyncio
+        import h2.config
+        import h2.connection
+        import h2.events
+        self.connections += 1
+        self._connections[writer] = asyncio.current_task()
+        connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+        bodies = {}
+        while True:
+            data = await reader.read(2 ** 16)
+            if not data:
+                break
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    bodies[event.stream_id] = b""
+                elif isinstance(event, h2.events.DataReceived):
+                    bodies[event.stream_id] += event.data
+                    connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    asyncio.ensure_future(self._respond(connection, writer, event.stream_id,
+                                                        bodies.pop(event.stream_id)))
+            writer.write(connection.data_to_send())
+            await writer.drain()
+        writer.close()
+        self._connections.pop(writer, None)
+
+    async def _respond(self, connection, writer, stream_id, body):
+        import asyncio
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        data = json.dumps(self.dispatch(json.loads(body))).encode()
+        connection.send_headers(stream_id, [(":status", "200"), ("content-type", "application/json"),
+                                            ("content-length", str(len(data)))])
+        # responses are expected to fit into the flow control window of the client
+        frame_size = connection.max_outbound_frame_size
+        for i in range(0, len(data), frame_size):
+            connection.send_data(stream_id, data[i:i + frame_size], end_stream=i + frame_size >= len(data))
+        writer.write(connection.data_to_send())
+
+
+def _serve(recording, queue):
+    server = StubRouter(recording)
+    queue.put(server.url)
+    server.serve_forever()
+
+
+def start_stub_router(recording: List[Dict]) -> tuple:
+    """
+    Start stub router in a separate process.
+
+    :param recording: recorded traffic, see :func:`load_recording`
+
+    :return: (url, process)
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(recording, queue), daemon=True)
+    process.start()
+    return queue.get(timeout=30), process
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _peak_rss_mb() -> Union[float, None]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+def run_load(recording: List[Dict],
+             sessions: int = 10,
+             iterations: int = 1,
+             arrival_rate: Union[float, None] = None,
+             think_time: float = 0,
+             url: Union[str, None] = None,
+             seed: Union[int, None] = None,
+             **glinet_kwargs) -> dict:
+    """
+    Replay recorded traffic with virtual sessions and measure the client side.
+
+    :param recording: recorded traffic, see :func:`load_recording`
+    :param sessions: number of virtual sessions
+    :param iterations: number of times every session replays the recording
+    :param arrival_rate: sessions started per second (poisson arrivals), None to start all sessions at once
+    :param think_time: mean time in seconds between two calls of a session (exponentially distributed)
+    :param url: url of a running stub router, if None a stub router is started in a separate process
+    :param seed: random seed for arrivals and think times
+    :param glinet_kwargs: further parameters passed to every :class:`~pyglinet.GlInet`
+
+    :return: report with number of requests and errors, throughput, latency percentiles, cpu time and peak memory
+    """
+    from pyglinet.glinet import GlInet
+    if not recording:
+        raise ValueError("Recording contains no calls to replay.")
+    rng = random.Random(seed)
+    process = None
+    if url is None:
+        url, process = start_stub_router(recording)
+    cache_folder = tempfile.mkdtemp(prefix="pyglinet-loadgen-")
+    with open(os.path.join(cache_folder, "api_reference.pkl"), "wb") as f:
+        pickle.dump({}, f)
+    glinet_kwargs.setdefault("verify_ssl_certificate", True)
+
+    arrivals = [0.0]
+    for _ in range(sessions - 1):
+        arrivals.append(arrivals[-1] + (rng.expovariate(arrival_rate) if arrival_rate else 0))
+    think_times = [[rng.expovariate(1 / think_time) if think_time else 0 for _ in range(iterations * len(recording))]
+                   for _ in range(sessions)]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def virtual_session(number, start):
+        delay = start - (time.perf_counter() - t0)
+        if delay > 0:
+            time.sleep(delay)
+        session_latencies = []
+        session_errors = []
+        glinet = None
+        try:
+            glinet = GlInet(url=url, password="loadgen", keep_alive=False, cache_folder=cache_folder,
+                            **glinet_kwargs).login()
+            for i in range(iterations * len(recording)):
+                call = recording[i % len(recording)]
+                request_start = time.perf_counter()
+                try:
+                    glinet.request(call["method"], call["params"])
+                except Exception as e:
+                    session_errors.append(repr(e))
+                session_latencies.append(time.perf_counter() - request_start)
+                if think_times[number][i]:
+                    time.sleep(think_times[number][i])
+            glinet.logout()
+        except Exception as e:
+            session_errors.append(repr(e))
+        finally:
+            if glinet:
+                glinet.close()
+        with lock:
+            latencies.extend(session_latencies)
+            errors.extend(session_errors)
+
+    threads = [threading.Thread(target=virtual_session, args=(i, start)) for i, start in enumerate(arrivals)]
+    cpu_start = time.process_time()
+    t0 = time.perf_counter()
+    try:
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+    finally:
+        duration = time.perf_counter() - t0
+        cpu_time = time.process_time() - cpu_start
+        if process:
+            process.terminate()
+            process.join()
+        shutil.rmtree(cache_folder, ignore_errors=True)
+
+    latencies.sort()
+    return {"sessions": sessions,
+            "requests": len(latencies),
+            "errors": len(errors),
+            "error_samples": errors[:5],
+            "duration": duration,
+            "throughput": len(latencies) / duration if duration else None,
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p90": _percentile(latencies, 90),
+            "latency_p99": _percentile(latencies, 99),
+            "latency_max": latencies[-1] if latencies else None,
+            "cpu_time": cpu_time,
+            "cpu_per_request": cpu_time / len(latencies) if latencies else None,
+            "peak_rss_mb": _peak_rss_mb()}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Replay recorded GL.Inet api traffic against a local stub router.")
+    parser.add_argument("recording", help="recording (json lines) or vcr cassette (yaml)")
+    parser.add_argument("--sessions", type=int, default=10, help="number of virtual sessions")
+    parser.add_argument("--iterations", type=int, default=1, help="replays of the recording per session")
+    parser.add_argument("--arrival-rate", type=float, default=None, help="sessions started per second")
+    parser.add_argument("--think-time", type=float, default=0, help="mean seconds between calls of a session")
+    parser.add_argument("--url", default=None, help="url of a running stub router")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(args)
+    report = run_load(load_recording(args.recording), sessions=args.sessions, iterations=args.iterations,
+                      arrival_rate=args.arrival_rate, think_time=args.think_time, url=args.url, seed=args.seed)
+    for key, value in report.items():
+        if isinstance(value, float):
+            value = f"{value * 1e3:.2f} ms" if key.startswith("latency") or key == "cpu_per_request" else f"{value:.2f}"
+        print(f"{key:<16} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+import hashlib
+import pickle
+import tempfile
+import time
+import logging
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+
+def dump_atomic(obj, file: str) -> None:
+    """
+    Pickle object to a temporary file and move it in place, such that readers never see a partially written file.
+
+    :param obj: object to dump
+    :param file: path to file
+
+    :return: None
+    """
+    folder = os.path.dirname(os.path.abspath(file))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(file)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f)
+        os.replace(tmp, file)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+class FileLock:
+    """
+    Exclusive inter-process lock based on a lock file (flock on posix, msvcrt.locking on Windows).
+    Every acquisition opens the lock file anew, so the lock also excludes threads of the same process.
+    """
+
+    def __init__(self, file: str, timeout: Union[float, None] = None, poll_interval: float = 0.05):
+        """
+        :param file: path to lock file, created if it doesn't exist
+        :param timeout: max seconds to wait for the lock, None to wait forever
+        :param poll_interval: seconds between attempts while the lock is held by someone else
+        """
+        self.file = file
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def acquire(self) -> None:
+        """
+        Wait for the lock.
+
+        :raises TimeoutError: if the lock could not be acquired within timeout
+        """
+        fd = os.open(self.file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl and self.timeout is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                deadline = None if self.timeout is None else time.monotonic() + self.timeout
+                while not self._try_lock(fd):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(f"Could not acquire lock {self.file} within {self.timeout} seconds.")
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class SessionStore:
+    """
+    Session id shared by all processes using the same cache folder, router url and username. The process holding
+    :meth:`lock` is the only one logging in, the others reuse the stored session id afterwards.
+    """
+
+    def __init__(self, folder: str, url: str, username: str, lock_timeout: Union[float, None] = 120):
+        """
+        :param folder: cache folder
+        :param url: router url
+        :param username: username
+        :param lock_timeout: max seconds to wait for the process logging in, None to wait forever
+        """
+        self.lock_timeout = lock_timeout
+        key = hashlib.sha1(f"{url}|{username}".encode()).hexdigest()[:16]
+        self.file = os.path.join(folder, f"session_{key}.pkl")
+        self._lock_file = os.path.join(folder, f"session_{key}.lock")
+
+    def lock(self) -> FileLock:
+        """
+        Exclusive lock to elect the process which logs in.
+
+        :return: FileLock, to be used as context manager
+
+        :raises TimeoutError: on entering the context, if the lock is held longer than lock_timeout
+        """
+        return FileLock(self._lock_file, self.lock_timeout)
+
+    def load(self) -> Union[str, None]:
+        """
+        :return: stored session id or None
+        """
+        try:
+            with open(self.file, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning(f"Could not load shared session from {self.file}: {e}")
+            return None
+
+    def save(self, sid: str) -> None:
+        dump_atomic(sid, self.file)
+
+    def clear(self, sid: str) -> None:
+        """
+        Remove stored session id if it is still the given one.
+
+        :param sid: session id which is no longer valid
+        """
+        with self.lock():
+            if self.load() == sid:
+                try:
+                    os.remove(self.file)
+                except FileNotFoundError:
+                    pass
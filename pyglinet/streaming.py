@@ -0,0 +1,142 @@
+import os
+import uuid
+import zlib
+import hashlib
+from collections import namedtuple
+from typing import Union, Callable, BinaryIO, Iterable
+
+DownloadResult = namedtuple("DownloadResult", ["bytes_received", "bytes_written", "checksum"])
+
+
+class MultipartStream:
+    """
+    File-like multipart/form-data body which reads the uploaded file chunk by chunk while it is sent. Memory usage
+    is bounded by the chunk size, independent of the file size.
+    """
+
+    def __init__(self,
+                 fields: dict,
+                 file_field: str,
+                 file: BinaryIO,
+                 filename: str,
+                 size: int,
+                 progress: Union[Callable[[int, int], None], None] = None,
+                 chunk_size: int = 2 ** 16):
+        """
+        :param fields: form fields sent before the file
+        :param file_field: name of the file field
+        :param file: binary file object positioned at the start of the data to upload
+        :param filename: file name sent to the server
+        :param size: number of bytes to upload from file
+        :param progress: callback called with (bytes sent, total bytes) after every chunk
+        :param chunk_size: max number of bytes read from file at once
+        """
+        self.boundary = uuid.uuid4().hex
+        preamble = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items())
+        preamble += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                     f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n').encode()
+        self._parts = [preamble, None, f"\r\n--{self.boundary}--\r\n".encode()]
+        self._file = file
+        self._file_remaining = size
+        self._part = 0
+        self._offset = 0
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self.sent = 0
+        self.total = len(preamble) + size + len(self._parts[2])
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self.total
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read next chunk of the body. At most min(size, chunk_size) bytes are returned.
+
+        :param size: max number of bytes
+
+        :return: bytes, empty at the end of the body
+        """
+        if size is None or size < 0:
+            size = self._chunk_size
+        size = min(size, self._chunk_size)
+        while self._part < len(self._parts):
+            if self._parts[self._part] is None:
+                data = self._file.read(min(size, self._file_remaining)) if self._file_remaining else b""
+                if not data:
+                    if self._file_remaining:
+                        raise IOError(f"File ended {self._file_remaining} bytes before the announced size.")
+                    self._part += 1
+                    continue
+                self._file_remaining -= len(data)
+            else:
+                data = self._parts[self._part][self._offset:self._offset + size]
+                self._offset += len(data)
+                if self._offset >= len(self._parts[self._part]):
+                    self._part += 1
+                    self._offset = 0
+                if not data:
+                    continue
+            self.sent += len(data)
+            if self._progress:
+                self._progress(self.sent, self.total)
+            return data
+        return b""
+
+
+def file_size(file: BinaryIO) -> int:
+    """
+    Number of bytes from the current position to the end of a seekable file.
+
+    :param file: binary file object
+
+    :return: size in bytes
+    """
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END) - position
+    file.seek(position)
+    return size
+
+
+def write_chunks(chunks: Iterable[bytes],
+                 file: BinaryIO,
+                 compress: Union[str, None] = None,
+                 checksum: Union[str, None] = "sha256",
+                 progress: Union[Callable[[int], None], None] = None) -> DownloadResult:
+    """
+    Write chunks to file, optionally gzip compressed, while computing the checksum of the uncompressed data.
+
+    :param chunks: iterable of bytes
+    :param file: binary file object to write to
+    :param compress: None or "gzip"
+    :param checksum: name of a hashlib algorithm, or None to skip the checksum
+    :param progress: callback called with the number of bytes received after every chunk
+
+    :return: DownloadResult with bytes received, bytes written and hex digest of the received data
+    """
+    if compress not in [None, "gzip"]:
+        raise ValueError(f"Unsupported compression {compress}, supported: gzip")
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    digest = hashlib.new(checksum) if checksum else None
+    received = written = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        received += len(chunk)
+        if digest:
+            digest.update(chunk)
+        data = compressor.compress(chunk) if compressor else chunk
+        file.write(data)
+        written += len(data)
+        if progress:
+            progress(received)
+    if compressor:
+        data = compressor.flush()
+        file.write(data)
+        written += len(data)
+    return DownloadResult(received, written, digest.hexdigest() if digest else None)
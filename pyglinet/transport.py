@@ -0,0 +1,168 @@
+"""
+Transports sending the json-rpc requests of :class:`~pyglinet.GlInet` to the router. The default transport uses
+requests (HTTP/1.1). :class:`Http2Transport` uses httpx and multiplexes concurrent requests on a single HTTP/2
+connection, which spares the router from handling one TCP/TLS connection per parallel request.
+"""
+import abc
+import logging
+import threading
+from typing import Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+log = logging.getLogger(__name__)
+
+
+class Transport(abc.ABC):
+    """
+    Base class of transports. The returned response must provide status_code, content and json().
+    """
+
+    @abc.abstractmethod
+    def post(self, url: str, json: dict, timeout: Union[float, None] = None):
+        """
+        Post json data.
+
+        :param url: url
+        :param json: json data
+        :param timeout: timeout in seconds, None to wait forever
+
+        :return: response
+        """
+        raise NotImplementedError
+
+    def is_connection_error(self, error: Exception) -> bool:
+        """
+        Check if an exception raised by :meth:`post` means that the router is unreachable or did not answer in time.
+        Only these errors count towards opening the circuit breaker.
+
+        :param error: exception raised by post
+
+        :return: True for connection and timeout errors
+        """
+        return isinstance(error, OSError)
+
+    def clear_cookies(self) -> None:
+        """
+        Forget cookies of the router session, called on logout.
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    HTTP/1.1 transport based on a requests session. Each request in flight needs its own connection.
+    """
+
+    def __init__(self, session: Union["requests.Session", None] = None, verify: Union[bool, str] = False):
+        """
+        :param session: requests session, a new one is created if None
+        :param verify: either True/False or path to certificate
+        """
+        if session is None:
+            import requests
+            session = requests.session()
+        self.session = session
+        self.verify = verify
+
+    def post(self, url: str, json: dict, timeout: Union[float, None] = None):
+        return self.session.post(url, json=json, verify=self.verify, timeout=timeout)
+
+    def is_connection_error(self, error: Exception) -> bool:
+        import requests
+        # all requests exceptions derive from OSError, including client side errors like an invalid url
+        if isinstance(error, requests.exceptions.RequestException):
+            return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        return super().is_connection_error(error)
+
+    def clear_cookies(self) -> None:
+        self.session.cookies.clear()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Http2Transport(Transport):
+    """
+    HTTP/2 transport based on httpx. Concurrent requests are multiplexed as streams on one connection.
+    Requires ``pip install python-glinet[http2]``.
+
+    The requests of all threads are handed to an asynchronous client running in a background event loop. Sharing the
+    synchronous httpx client between threads can send stream headers out of order, which the router rejects.
+    """
+
+    def __init__(self, verify: Union[bool, str] = False, max_connections: int = 1, http1: bool = True):
+        """
+        :param verify: either True/False or path to certificate
+        :param max_connections: max number of connections to the router
+        :param http1: if True, HTTP/2 is negotiated via TLS ALPN and HTTP/1.1 is used as fallback. If False, HTTP/2 is
+            used with prior knowledge, which also works with unencrypted http urls.
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("Http2Transport requires httpx with http2 support. "
+                              "Install it with: pip install python-glinet[http2]") from e
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pyglinet-http2", daemon=True)
+        self._thread.start()
+
+        async def create_client():
+            return httpx.AsyncClient(http1=http1, http2=True, verify=verify,
+                                     limits=httpx.Limits(max_connections=max_connections))
+
+        self.client = self._run(create_client())
+
+    def _run(self, coroutine):
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def post(self, url: str, json: dict, timeout: Union[float, None] = None):
+        return self._run(self.client.post(url, json=json, timeout=timeout))
+
+    def is_connection_error(self, error: Exception) -> bool:
+        import httpx
+        return isinstance(error, httpx.TransportError) or super().is_connection_error(error)
+
+    def clear_cookies(self) -> None:
+        self.client.cookies.clear()
+
+    def close(self) -> None:
+        """
+        Close the connections and stop the event loop thread.
+        """
+        if not self._loop.is_running():
+            return
+        if threading.current_thread() is self._thread:
+            # e.g. garbage collected on the loop thread, which must not wait for itself
+            self._loop.create_task(self.client.aclose()).add_done_callback(lambda task: self._loop.stop())
+            return
+        try:
+            self._run(self.client.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+
+def create_transport(transport: Union[str, Transport], session: "requests.Session") -> Transport:
+    """
+    Create transport from name.
+
+    :param transport: "requests", "http2" or Transport instance
+    :param session: requests session used by the requests transport
+
+    :return: Transport
+    """
+    if isinstance(transport, Transport):
+        return transport
+    elif transport == "requests":
+        return RequestsTransport(session)
+    elif transport == "http2":
+        return Http2Transport()
+    raise ValueError(f"Unknown transport {transport}, supported: requests, http2 or a Transport instance.")
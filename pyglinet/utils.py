@@ -1,5 +1,7 @@
 from collections import namedtuple, OrderedDict
 import re
+import keyword
+import pyglinet.exceptions as exceptions
 
 
 class ResultContainer(dict):
@@ -22,5 +24,138 @@ class ResultContainer(dict):
         return str(self.__dict__)
 
 
+class CompactRecord:
+    """
+    Base class for compact result records. Subclasses are generated by :func:`record_schema` and define their
+    fields as ``__slots__``, so instances carry neither a ``__dict__`` nor a copy of the data in a dict.
+    Like :class:`ResultContainer`, fields can be accessed via '.' or via '[]'.
+    """
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @property
+    def _fields(self):
+        return self.__slots__
+
+    def _asdict(self):
+        return {name: _unwrap_record(getattr(self, name)) for name in self.__slots__}
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, (CompactRecord, dict)):
+            return self._asdict() == _unwrap_record(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return str(self._asdict())
+
+    def __str__(self):
+        return str(self._asdict())
+
+
+def _unwrap_record(value):
+    if isinstance(value, CompactRecord):
+        return value._asdict()
+    elif isinstance(value, dict):
+        return {k: _unwrap_record(v) for k, v in value.items()}
+    elif isinstance(value, (tuple, list)):
+        return type(value)([_unwrap_record(v) for v in value])
+    return value
+
+
+def record_schema(name, example):
+    """
+    Derive a record schema from a documented example response. Every dict in the example becomes a
+    :class:`CompactRecord` subclass with one slot per key, lists take the schema of their first element.
+
+    :param name: type name of the generated record classes
+    :param example: example data, e.g. the result of a parsed ``out_example``
+
+    :return: schema for :func:`to_record`, None if the example can't be expressed as records
+    """
+    if isinstance(example, dict):
+        if not example or not all(isinstance(k, str) and k.isidentifier() and not keyword.iskeyword(k)
+                                  and not k.startswith("_") for k in example):
+            return None
+        fields = tuple(example)
+        record_type = type(sanitize_string(name), (CompactRecord,), {"__slots__": fields})
+        return record_type, tuple(record_schema(f"{name}__{k}", v) for k, v in example.items())
+    elif isinstance(example, list):
+        return [record_schema(name, example[0]) if example else None]
+    return None
+
+
+def to_record(schema, data):
+    """
+    Convert json data into records of the given schema.
+
+    :param schema: schema as created by :func:`record_schema`
+    :param data: json decoded data
+
+    :return: converted data
+
+    :raises SchemaMismatchError: if data doesn't have the shape of the schema
+    """
+    if isinstance(schema, tuple):
+        record_type, field_schemas = schema
+        if not isinstance(data, dict) or len(data) != len(record_type.__slots__):
+            raise exceptions.SchemaMismatchError(f"{record_type.__name__} expects fields {record_type.__slots__}")
+        values = []
+        try:
+            for field, field_schema in zip(record_type.__slots__, field_schemas):
+                value = data[field]
+                if field_schema is not None:
+                    value = to_record(field_schema, value)
+                elif isinstance(value, (dict, list)):
+                    raise exceptions.SchemaMismatchError(f"Expected scalar value for {field}, got {type(value)}")
+                values.append(value)
+        except KeyError as e:
+            raise exceptions.SchemaMismatchError(f"{record_type.__name__} has no field {e}")
+        return record_type(*values)
+    elif isinstance(schema, list):
+        if not isinstance(data, list):
+            raise exceptions.SchemaMismatchError(f"Expected list, got {type(data)}")
+        return [to_record(schema[0], v) for v in data]
+    elif isinstance(data, (dict, list)):
+        raise exceptions.SchemaMismatchError(f"Expected scalar value, got {type(data)}")
+    return data
+
+
 def sanitize_string(string):
     return re.sub(r"[,\-!/]", "_", string)
+
+
+def tokenize(string):
+    """
+    Split a string into lower case search tokens. Identifiers like ``get_config`` or ``wg-client`` yield the
+    full identifier as well as its parts.
+
+    :param string: text to tokenize
+
+    :return: list of tokens
+    """
+    tokens = []
+    for word in re.findall(r"[\w\-]+", str(string).lower()):
+        parts = [p for p in re.split(r"[_\-]", word) if p]
+        if len(parts) > 1:
+            tokens.append(sanitize_string(word))
+        tokens.extend(parts)
+    return tokens
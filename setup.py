@@ -25,6 +25,8 @@ setuptools.setup(
         "License :: OSI Approved :: GNU General Public License v3 or later (GPLv3+)"
     ],
     python_requires=">=3.6",
-    install_requires=["ipython", "tabulate", "requests", "passlib"],
+    install_requires=["tabulate", "requests", "passlib"],
+    extras_require={"ipython": ["ipython"], "http2": ["httpx[http2]"], "numpy": ["numpy"], "pandas": ["pandas"],
+                    "arrow": ["pyarrow"]},
     packages=setuptools.find_packages()
 )
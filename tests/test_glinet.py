@@ -1,12 +1,40 @@
 import time
 import pytest
-from pyglinet import GlInet, exceptions, decorators
+from pyglinet import GlInet, exceptions, decorators, utils, limiter, loadgen, fleet, session_store, columnar
 import pyglinet.glinet_api as glinet_api
 import os
 import sys
 from io import StringIO
 from contextlib import contextmanager
 import pathlib
+import pickle
+import gc
+import subprocess
+import threading
+import json
+import email
+import gzip
+import copy
+import hashlib
+import io
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+API_DESCRIPTION = {
+    "wifi": {"module_name": ["wifi"], "case_groups_data": {
+        "get_config": {"module_name": ["wifi"], "data": {"title": "get_config"},
+                       "params": [{"keyName": "?band", "dataType__name": "string", "desp": "frequency band"}],
+                       "in_example": "{}",
+                       "out_example": '{"jsonrpc": "2.0", "id": 1, "result": {"channel": 36, "ssid": "gl"}}'},
+        "set_channel": {"module_name": ["wifi"], "data": {"title": "set_channel"},
+                        "params": [{"keyName": "channel", "dataType__name": "number", "desp": "radio channel"}],
+                        "in_example": "{}", "out_example": "{}"}}},
+    "clients": {"module_name": ["clients"], "case_groups_data": {
+        "get_list": {"module_name": ["clients"], "data": {"title": "get_list"}, "params": [],
+                     "in_example": "{}",
+                     "out_example": '{"jsonrpc": "2.0", "id": 1, "result": {"clients": '
+                                    '[{"mac": "00:11", "online": true, "rx": 1}]}}'}}}
+}
 
 
 @contextmanager
@@ -30,6 +58,82 @@ def glinet_base():
     gl._stop_keep_alive_thread()
 
 
+@pytest.fixture()
+def glinet_offline(tmp_path):
+    with open(tmp_path / "api_reference.pkl", "wb") as f:
+        pickle.dump(API_DESCRIPTION, f)
+    gl = GlInet(password="password", keep_alive=False, cache_folder=tmp_path.as_posix())
+    yield gl
+    gl._stop_keep_alive_thread()
+
+
+@pytest.fixture()
+def stub_router(tmp_path):
+    """
+    Stub router from the load generator, extended with upload and download endpoints
+    """
+    class Handler(loadgen._StubRouterHandler):
+        def do_POST(self):
+            if self.path == "/upload":
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                self.server.uploads.append((self.headers["Content-Type"], body))
+                self._reply(json.dumps({"code": 0}).encode())
+            elif self.path == "/download":
+                form = urllib.parse.parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+                if form["sid"][0] not in self.server.sids:
+                    self.send_response(403)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._reply(self.server.files[form["path"][0]])
+            else:
+                super().do_POST()
+
+        def do_GET(self):
+            data = json.dumps({"data": list(self.server.description.values())}).encode()
+            etag = '"' + hashlib.sha1(data).hexdigest() + '"' if self.server.etag else None
+            if etag and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.server.description_downloads += 1
+            self.send_response(200)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _reply(self, data):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    router = loadgen.StubRouter([{"method": "call", "params": ["clients", "get_list"],
+                                  "response": {"jsonrpc": "2.0", "id": 1, "result": {"clients": [
+                                      {"mac": "00:11", "online": True, "rx": 1}]}}}])
+    router.RequestHandlerClass = Handler
+    router.uploads = []
+    router.files = {}
+    router.description = copy.deepcopy(API_DESCRIPTION)
+    router.description_downloads = 0
+    router.etag = True
+    threading.Thread(target=router.serve_forever, daemon=True).start()
+    yield router
+    router.shutdown()
+    router.server_close()
+
+
+@pytest.fixture()
+def glinet_stub(stub_router, glinet_offline):
+    gl = GlInet(url=stub_router.url, password="password", keep_alive=False,
+                cache_folder=glinet_offline._cache_folder).login()
+    yield gl
+    gl.logout()
+
+
 @pytest.mark.vcr()
 def test_login_logout_caching(glinet_base):
     time.sleep(0.3)
@@ -177,3 +281,538 @@ def test_requests(glinet_base):
 def test_unix_crypt(glinet_base):
     with pytest.raises(exceptions.UnsupportedHashAlgoError):
         glinet_base._GlInet__generate_unix_passwd_hash("password", "2", "salt")
+
+
+def test_api_search(glinet_offline):
+    api = glinet_api.GlInetApi(glinet_offline._api_description, glinet_offline)
+    assert api.search("wifi channel")[0] is api.wifi.set_channel, "Best match should cover all terms"
+    assert api.search("chan") == api.search("channel"), "Prefixes should match"
+    assert api.search("mac") == [], "Output fields are not indexed"
+    assert api.search("client list") == [api.clients.get_list]
+    assert len(api.search("wifi", limit=1)) == 1
+    assert os.path.exists(glinet_offline._api_search_index_cache_path), "Search index was not persisted"
+    gl = GlInet(keep_alive=False, cache_folder=glinet_offline._cache_folder)
+    assert gl.api_search_index.search("band") == [("wifi", "get_config")], "Index not loaded from cache"
+
+
+def test_compact_results():
+    class Session:
+        _compact_results = True
+        response = None
+
+        def request(self, method, params, raw=False):
+            return {"jsonrpc": "2.0", "id": 1, "result": self.response}
+
+    session = Session()
+    api = glinet_api.GlInetApi(API_DESCRIPTION, session)
+    session.response = {"clients": [{"mac": "00:11", "online": True, "rx": 1}, {"mac": "00:12", "online": False,
+                                                                              "rx": 2}]}
+    res = api.clients.get_list()
+    assert isinstance(res, utils.CompactRecord), "Result should be a compact record"
+    assert not hasattr(res.clients[0], "__dict__"), "Records should be slotted"
+    assert res.clients[1].mac == res["clients"][1]["mac"] == "00:12"
+    assert res == session.response, "Records should compare equal to the json data"
+    assert res == utils.ResultContainer("test", session.response)
+    str(res)
+    repr(res)
+    session.response = {"clients": [{"mac": "00:11", "online": True}]}
+    res = api.clients.get_list()
+    assert isinstance(res, utils.ResultContainer), "Mismatching result should fall back to ResultContainer"
+    assert res.clients[0].mac == "00:11"
+    session.response = None
+    assert api.wifi.set_channel() is None
+    assert utils.record_schema("test", {"not-an-identifier": 1}) is None
+
+
+def test_import_time():
+    code = "import sys, pyglinet; print(','.join(m for m in ['requests', 'passlib', 'tabulate', 'IPython', 'httpx', " \
+           "'numpy', 'pandas', 'pyarrow'] " \
+           "if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True, check=True,
+                         cwd=pathlib.Path(__file__).parent.parent)
+    assert out.stdout.strip() == "", f"Heavy modules imported by 'import pyglinet': {out.stdout}"
+
+
+def test_rate_and_concurrency_limits(glinet_offline):
+    bucket = limiter.TokenBucket(rate=50, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.07, "Rate limit not applied"
+    with pytest.raises(ValueError):
+        limiter.TokenBucket(rate=0)
+
+    aimd = limiter.AdaptiveConcurrencyLimiter(max_limit=4)
+    for _ in range(20):
+        aimd.acquire()
+        aimd.release(0.01)
+    assert int(aimd.limit) == 4, "Limit should grow up to max_limit"
+    aimd.acquire()
+    aimd.release(0.01, success=False)
+    assert int(aimd.limit) == 2, "Limit should be cut on errors"
+    aimd._last_decrease = float("-inf")
+    aimd.acquire()
+    aimd.release(1.0)
+    assert int(aimd.limit) == 1, "Limit should be cut on high latency"
+
+    peak = []
+    aimd = limiter.AdaptiveConcurrencyLimiter(max_limit=2)
+    aimd.limit = 2
+
+    def worker():
+        aimd.acquire()
+        peak.append(aimd.in_flight)
+        time.sleep(0.02)
+        aimd.release(0.02)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert max(peak) <= 2, "Concurrency limit exceeded"
+
+    gl = GlInet(keep_alive=False, cache_folder=glinet_offline._cache_folder, rate_limit=5, max_concurrency=3)
+    limits = gl.limits
+    assert limits["rate_limit"] == 5 and limits["max_concurrency"] == 3 and limits["queue_depth"] == 0
+
+    aimd = limiter.AdaptiveConcurrencyLimiter(max_limit=8)
+    for _ in range(100):
+        aimd.acquire()
+        aimd.release(0.002, key="alive")
+        aimd.acquire()
+        aimd.release(0.03, key="clients/get_list")
+    assert int(aimd.limit) == 8, "Cheap and expensive methods should not be mistaken for overload"
+    assert aimd.min_latency == 0.002
+
+    aimd = limiter.AdaptiveConcurrencyLimiter(max_limit=8)
+    for latency in [0.01] + [0.1] * 400:
+        aimd.acquire()
+        aimd.release(latency)
+    assert int(aimd.limit) == 8, "Lowest latency should follow a persistently higher latency"
+    assert aimd.min_latency > 0.05
+    aimd.acquire()
+    aimd.release(None, key="alive")
+    assert "alive" not in aimd._baselines, "Requests without latency should not be sampled"
+
+    aimd = limiter.AdaptiveConcurrencyLimiter(max_limit=16)
+    for _ in range(7):
+        aimd.acquire()
+        aimd.release(0.01)
+    assert int(aimd.limit) == 8, "Slow start should grow the limit by one per successful request"
+
+    order = []
+    aimd = limiter.AdaptiveConcurrencyLimiter(max_limit=1)
+    aimd.acquire()
+
+    def waiter(name):
+        aimd.acquire()
+        order.append(name)
+        aimd.release(None)
+
+    waiters = [threading.Thread(target=waiter, args=(name,)) for name in "ab"]
+    for t in waiters:
+        t.start()
+        while aimd.waiting < waiters.index(t) + 1:
+            time.sleep(0.001)
+    aimd.release(None)
+    aimd.acquire()
+    order.append("again")
+    aimd.release(None)
+    [t.join() for t in waiters]
+    assert order == ["a", "b", "again"], "Slots should be granted in arrival order"
+
+
+def test_concurrency_limit_mixed_latencies(stub_router, glinet_offline):
+    dispatch = stub_router.dispatch
+
+    def slow_calls(request):
+        if request.get("method") == "call":
+            time.sleep(0.03)
+        return dispatch(request)
+
+    stub_router.dispatch = slow_calls
+    gl = GlInet(url=stub_router.url, password="password", keep_alive=False, cache_folder=glinet_offline._cache_folder,
+                max_concurrency=8).login()
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: gl.request("call", ["clients", "get_list"]), range(200)))
+    assert gl.limits["concurrency_limit"] == 8
+    assert time.monotonic() - start < 3, "Requests should run in parallel"
+    gl.logout()
+
+
+def test_circuit_breaker(glinet_offline):
+    gl = GlInet(url="http://127.0.0.1:1/rpc", keep_alive=False, cache_folder=glinet_offline._cache_folder,
+                request_timeout=1, circuit_failure_threshold=2, circuit_reset_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(OSError):
+            gl.request("challenge", {"username": "root"})
+    assert gl.circuit_state == "open"
+    start = time.monotonic()
+    with pytest.raises(exceptions.CircuitOpenError):
+        gl.request("challenge", {"username": "root"})
+    with pytest.raises(exceptions.CircuitOpenError):
+        gl.request("alive", {"sid": "sid"})
+    assert time.monotonic() - start < 0.05, "Open circuit should fail fast"
+    time.sleep(0.06)
+    assert gl.circuit_state == "half_open"
+    with pytest.raises(OSError):
+        gl.request("challenge", {"username": "root"})
+    assert gl.circuit_state == "open" and gl._circuit_breaker.reset_timeout == 0.1, "Failed probe should back off"
+
+    breaker = gl._circuit_breaker
+    breaker.reset_timeout = 0
+    breaker.before_request()
+    with pytest.raises(exceptions.CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.reset_timeout == 0.05 and breaker.failures == 0
+
+
+def test_circuit_breaker_ignores_client_errors(glinet_offline):
+    from pyglinet.transport import RequestsTransport
+
+    gl = GlInet(url="http://127.0.0.1:1/rpc", keep_alive=False, cache_folder=glinet_offline._cache_folder,
+                request_timeout=1, circuit_failure_threshold=2, circuit_reset_timeout=0.05)
+    for _ in range(3):
+        with pytest.raises(TypeError):
+            gl.request("challenge", {"username": object()})
+    assert gl.circuit_state == "closed" and gl._circuit_breaker.failures == 0, "Client errors should not count"
+    assert gl._concurrency_limiter.in_flight == 0
+
+    with pytest.raises(OSError):
+        gl.request("challenge", {"username": "root"})
+    breaker = gl._circuit_breaker
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker.reset_timeout = 0
+    breaker.before_request()
+    breaker.record_ignored()
+    breaker.before_request()
+    assert breaker.state == "half_open", "Ignored probe should free the probe slot without closing the circuit"
+
+    import requests
+    transport = RequestsTransport()
+    assert transport.is_connection_error(requests.exceptions.ConnectTimeout())
+    assert transport.is_connection_error(ConnectionRefusedError())
+    assert not transport.is_connection_error(requests.exceptions.InvalidURL())
+    assert not transport.is_connection_error(ValueError())
+
+
+def test_loadgen(tmp_path):
+    recording = loadgen.load_recording((pathlib.Path(__file__).parent / "cassettes/test_api_client_01.yaml").as_posix())
+    assert recording and all(r["method"] == "call" for r in recording), "Session calls should be skipped"
+    router = loadgen.StubRouter(recording)
+    threading.Thread(target=router.serve_forever, daemon=True).start()
+    try:
+        with open(tmp_path / "api_reference.pkl", "wb") as f:
+            pickle.dump(API_DESCRIPTION, f)
+        gl = GlInet(url=router.url, password="password", keep_alive=False, cache_folder=tmp_path.as_posix()).login()
+        gl.start_recording((tmp_path / "recording.jsonl").as_posix())
+        res = gl.request("call", ["clients", "get_status"])
+        with pytest.raises(exceptions.MethodNotFoundError):
+            gl.request("call", ["led", "not_recorded"])
+        gl.stop_recording()
+        gl.logout()
+        replay = loadgen.load_recording((tmp_path / "recording.jsonl").as_posix())
+        assert replay[0]["params"] == ["clients", "get_status"], "Recording should not contain sid"
+        assert replay[0]["response"]["result"] == res.result
+
+        report = loadgen.run_load(replay[:1], sessions=4, iterations=3, arrival_rate=200, think_time=0.001,
+                                  url=router.url, seed=1)
+        assert report["requests"] == 12 and report["errors"] == 0, report
+        assert report["latency_p50"] <= report["latency_p99"] <= report["latency_max"]
+    finally:
+        router.shutdown()
+        router.server_close()
+
+
+def test_upload(glinet_stub, stub_router, tmp_path):
+    data = os.urandom(300000)
+    (tmp_path / "firmware.img").write_bytes(data)
+    progress = []
+    res = glinet_stub.upload(tmp_path / "firmware.img", "/tmp/firmware.img", chunk_size=4096,
+                             progress=lambda sent, total: progress.append((sent, total)))
+    assert res == {"code": 0}
+    content_type, body = stub_router.uploads[0]
+    assert progress[-1][0] == progress[-1][1] == len(body), "Progress should reach the body size"
+    assert max(b[0] - a[0] for a, b in zip(progress, progress[1:])) <= 4096, "Chunks exceed chunk size"
+    message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    parts = {p.get_param("name", header="content-disposition"): p.get_payload(decode=True)
+             for p in message.get_payload()}
+    assert parts["sid"].decode() == glinet_stub._sid
+    assert parts["size"] == str(len(data)).encode() and parts["path"] == b"/tmp/firmware.img"
+    assert parts["file"] == data, "Uploaded file is corrupted"
+
+    results = fleet.upload([glinet_stub, GlInet(url="http://127.0.0.1:1/rpc", keep_alive=False,
+                                                cache_folder=tmp_path.as_posix())],
+                           tmp_path / "firmware.img", "/tmp/firmware.img")
+    assert results[glinet_stub._url] == {"code": 0}
+    assert isinstance(results["http://127.0.0.1:1/rpc"], exceptions.NotLoggedInError)
+
+
+def test_download(glinet_stub, stub_router, tmp_path):
+    data = os.urandom(200000)
+    stub_router.files["/tmp/backup.tar.gz"] = data
+    received = []
+    res = glinet_stub.download("/tmp/backup.tar.gz", tmp_path / "backup.tar.gz", chunk_size=4096,
+                               progress=received.append)
+    assert (tmp_path / "backup.tar.gz").read_bytes() == data
+    assert res == (len(data), len(data), hashlib.sha256(data).hexdigest())
+    assert received[-1] == len(data) and len(received) >= len(data) // 4096
+
+    buffer = io.BytesIO()
+    res = glinet_stub.download("/tmp/backup.tar.gz", buffer, compress="gzip", checksum="md5")
+    assert gzip.decompress(buffer.getvalue()) == data and res.bytes_written == len(buffer.getvalue())
+    assert res.checksum == hashlib.md5(data).hexdigest()
+
+    sid = glinet_stub._sid
+    stub_router.sids.discard(sid)
+    with pytest.raises(ConnectionError):
+        glinet_stub._GlInet__post_stream(urllib.parse.urljoin(glinet_stub._url, "download"),
+                                         data={"sid": sid, "path": "/tmp/backup.tar.gz"})
+    stub_router.sids.add(sid)
+    results = fleet.download([glinet_stub], "/tmp/backup.tar.gz", (tmp_path / "{host}.tar.gz").as_posix())
+    host = urllib.parse.urlsplit(glinet_stub._url).netloc.replace(":", "_")
+    assert results[glinet_stub._url].bytes_received == len(data)
+    assert (tmp_path / f"{host}.tar.gz").read_bytes() == data
+    assert not list(tmp_path.glob("*.part")), "Temporary file not removed"
+
+
+def test_shared_session(stub_router, glinet_offline):
+    def worker():
+        return GlInet(url=stub_router.url, password="password", keep_alive=False, share_session=True,
+                      cache_folder=glinet_offline._cache_folder).login()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        workers = list(executor.map(lambda i: worker(), range(4)))
+    sids = {w._sid for w in workers}
+    assert len(sids) == 1 and len(stub_router.sids) == 1, "Workers should share a single login"
+
+    stub_router.sids.clear()
+    gl = worker()
+    assert gl._sid not in sids and stub_router.sids == {gl._sid}, "Expired shared session should be renewed"
+    assert session_store.SessionStore(glinet_offline._cache_folder, stub_router.url, "root").load() == gl._sid
+    gl.logout()
+    assert session_store.SessionStore(glinet_offline._cache_folder, stub_router.url, "root").load() is None
+
+    session_store.dump_atomic({"data": 1}, os.path.join(glinet_offline._cache_folder, "test.pkl"))
+    assert [f for f in os.listdir(glinet_offline._cache_folder) if f.endswith(".tmp")] == []
+
+
+def test_conditional_api_description_refresh(stub_router, tmp_path):
+    url = stub_router.url.replace("/rpc", "/docs")
+    gl = GlInet(url=stub_router.url, password="password", keep_alive=False, cache_folder=tmp_path.as_posix(),
+                api_reference_url=url).login()
+    api1 = gl.get_api_client()
+    assert stub_router.description_downloads == 1 and api1.wifi.get_config
+
+    api2 = gl.get_api_client(update_description=True)
+    assert stub_router.description_downloads == 1, "Unchanged description should not be downloaded again"
+    assert api2 is not api1 and api2.wifi is api1.wifi and api2.clients is api1.clients
+
+    stub_router.etag = False
+    api3 = gl.get_api_client(update_description=True)
+    assert stub_router.description_downloads == 2 and api3.wifi is api1.wifi, "Same content should not be rebuilt"
+
+    stub_router.description["clients"]["case_groups_data"]["get_list"]["params"] = [
+        {"keyName": "?offline", "dataType__name": "bool", "desp": "include offline clients"}]
+    api4 = gl.get_api_client(update_description=True)
+    assert api4.wifi is api1.wifi, "Unchanged module should be reused"
+    assert api4.clients is not api1.clients and api4.clients.get_list.params[0].keyName == "?offline"
+    assert api4.search("offline") == [api4.clients.get_list], "Search index not updated"
+
+    gl2 = GlInet(url=stub_router.url, keep_alive=False, cache_folder=tmp_path.as_posix(), api_reference_url=url,
+                 update_api_reference_cache=True)
+    assert stub_router.description_downloads == 4 and gl2._api_description_changes == set()
+    assert gl2._api_description == gl._api_description
+    gl.logout()
+
+
+def test_api_description_refresh_shared_cache(stub_router, tmp_path):
+    url = stub_router.url.replace("/rpc", "/docs")
+    gl1, gl2 = [GlInet(url=stub_router.url, password="password", keep_alive=False, cache_folder=tmp_path.as_posix(),
+                       api_reference_url=url).login() for _ in range(2)]
+    api1, api2 = gl1.get_api_client(), gl2.get_api_client()
+
+    stub_router.description["clients"]["case_groups_data"]["get_list"]["params"] = [
+        {"keyName": "?offline", "dataType__name": "bool", "desp": "include offline clients"}]
+    for etag in [True, False]:
+        stub_router.etag = etag
+        stub_router.description["clients"]["case_groups_data"]["get_list"]["params"][0]["desp"] = f"etag {etag}"
+        for gl, api in [(gl1, api1), (gl2, api2)]:
+            new_api = gl.get_api_client(update_description=True)
+            assert gl._api_description_changes == {"clients"}, "Refresh by another instance hides the change"
+            assert new_api.clients.get_list.params[0].desp == f"etag {etag}" and new_api.wifi is api.wifi
+        api1, api2 = gl1.api, gl2.api
+    gl1.logout()
+    gl2.logout()
+
+
+def test_http2_transport(glinet_offline):
+    pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    from pyglinet.transport import Http2Transport, RequestsTransport
+    router = loadgen.Http2StubRouter([{"method": "call", "params": ["clients", "get_status"],
+                                       "response": {"jsonrpc": "2.0", "id": 1, "result": {"online": 3}}}],
+                                     delay=0.05).start()
+    try:
+        gl = GlInet(url=router.url, password="password", keep_alive=False, cache_folder=glinet_offline._cache_folder,
+                    transport=Http2Transport(http1=False), max_concurrency=8).login()
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: gl.request("call", ["clients", "get_status"]).result.online,
+                                        range(16)))
+        # 16 alive checks and 16 calls take 32 round trips one at a time
+        assert time.monotonic() - start < 16 * 0.05, "Requests should be in flight concurrently"
+        assert results == [3] * 16 and gl.limits["concurrency_limit"] == 8
+        assert router.connections == 1, "Concurrent requests should be multiplexed on one connection"
+        gl.logout()
+
+        def loop_threads():
+            return len([t for t in threading.enumerate() if t.name == "pyglinet-http2"])
+
+        threads = loop_threads()
+        gl.close()
+        assert loop_threads() == threads - 1
+        clients = [GlInet(url=router.url, keep_alive=False, cache_folder=glinet_offline._cache_folder,
+                          transport="http2") for _ in range(5)]
+        assert loop_threads() == threads + 4
+        clients[0].close()
+        del clients
+        gc.collect()
+        assert loop_threads() == threads - 1, "Event loop threads of the transports should be stopped"
+    finally:
+        router.shutdown()
+    assert isinstance(glinet_offline._transport, RequestsTransport), "requests should stay the default transport"
+    with pytest.raises(ValueError):
+        GlInet(keep_alive=False, cache_folder=glinet_offline._cache_folder, transport="http3")
+
+
+def test_custom_transport(stub_router, glinet_offline):
+    from pyglinet.transport import Transport
+
+    class PostOnlyTransport(Transport):
+        def post(self, url, json, timeout=None):
+            import requests
+            return requests.post(url, json=json, timeout=timeout)
+
+    with pytest.raises(TypeError):
+        Transport()
+    gl = GlInet(url=stub_router.url, password="password", keep_alive=False, cache_folder=glinet_offline._cache_folder,
+                transport=PostOnlyTransport()).login()
+    assert gl.logout() and gl._sid is None and not stub_router.sids
+
+
+def test_snapshot(glinet_stub, stub_router, tmp_path):
+    stub_router.delay = 0.05
+    summary = glinet_stub.snapshot(tmp_path / "snapshot.jsonl.gz", max_workers=4)
+    assert summary["calls"] == 2 and summary["errors"] == 1 and summary["skipped"] == 0
+    with gzip.open(tmp_path / "snapshot.jsonl.gz", "rt") as f:
+        header, *entries = [json.loads(line) for line in f]
+    assert header["host"] == glinet_stub._url and header["calls"] == 2
+    entries = {(e["module"], e["method"]): e for e in entries}
+    assert entries[("clients", "get_list")]["result"] == {"clients": [{"mac": "00:11", "online": True, "rx": 1}]}
+    assert "MethodNotFoundError" in entries[("wifi", "get_config")]["error"]
+    assert all(e["elapsed"] >= 0.05 for e in entries.values())
+
+    glinet_stub._api_description = copy.deepcopy(API_DESCRIPTION)
+    glinet_stub._api_description["wifi"]["case_groups_data"]["get_config"]["params"][0]["keyName"] = "band"
+    results = fleet.snapshot([glinet_stub], (tmp_path / "{host}.jsonl.gz").as_posix())
+    assert results[glinet_stub._url]["calls"] == 1 and results[glinet_stub._url]["skipped"] == 1
+
+    for i in range(63):
+        glinet_stub._api_description[f"m{i}"] = {"module_name": [f"m{i}"], "case_groups_data": {
+            "get_status": {"module_name": [f"m{i}"], "data": {"title": "get_status"}, "params": []}}}
+    stub_router.delay = 0.05
+    summary = glinet_stub.snapshot(tmp_path / "parallel.jsonl.gz", max_workers=8)
+    # 64 calls on 8 workers take 8 round trips, a serial snapshot would take 64
+    assert summary["calls"] == 64 and summary["duration"] < 8 * 0.05 * 2, \
+        "Snapshot should run max_workers calls in parallel"
+    assert glinet_stub._concurrency_limiter.max_limit == 1 and glinet_stub._concurrency_limiter.limit <= 1
+
+    (tmp_path / "dir").mkdir()
+    with pytest.raises(OSError):
+        glinet_stub.snapshot(tmp_path / "dir")
+    assert not os.path.exists(f"{tmp_path / 'dir'}.part"), "Partial snapshot should be removed"
+
+
+def test_coordinated_relogin(glinet_stub, stub_router):
+    logins = []
+    dispatch = stub_router.dispatch
+
+    def counting_dispatch(request):
+        if request.get("method") == "login":
+            logins.append(request)
+        return dispatch(request)
+
+    stub_router.dispatch = counting_dispatch
+    stub_router.delay = 0.02
+    old_sid = glinet_stub._sid
+    stub_router.sids.clear()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: glinet_stub.request("call", ["clients", "get_list"]), range(16)))
+    assert len(logins) == 1, "Expired session should be renewed by a single login"
+    assert glinet_stub._sid != old_sid and stub_router.sids == {glinet_stub._sid}
+    assert all(r.result.clients[0].mac == "00:11" for r in results)
+
+    def denied():
+        raise exceptions.AccessDeniedError("denied")
+
+    with pytest.raises(exceptions.AccessDeniedError):
+        # session is alive, access denied is not caused by the session and is not retried
+        glinet_stub._GlInet__with_session_recovery(denied)
+    assert len(logins) == 1
+
+    glinet_stub.logout()
+    with pytest.raises(exceptions.NotLoggedInError):
+        glinet_stub.request("call", ["clients", "get_list"])
+    assert len(logins) == 1, "No login should take place after logout"
+
+
+COLUMNAR_RESPONSE = {"jsonrpc": "2.0", "id": 1, "result": {"clients": [
+    {"mac": "00:11", "rx": 1, "wifi": {"band": "2.4G", "rssi": -40}, "tags": ["a"]},
+    {"mac": "00:12", "rx": None, "wifi": {"band": "5G"}, "alias": "tv"}]}}
+
+
+def test_columnar_export(glinet_stub, stub_router):
+    data = COLUMNAR_RESPONSE
+    cols = columnar.flatten(columnar.records(data))
+    assert cols == {"mac": ["00:11", "00:12"], "rx": [1, None], "wifi.band": ["2.4G", "5G"], "wifi.rssi": [-40, None],
+                    "tags": [["a"], None], "alias": [None, "tv"]}
+    assert columnar.records({"channel": 1}) == [{"channel": 1}]
+    with pytest.raises(ValueError):
+        columnar.records({"a": [], "b": []})
+    assert columnar.records({"a": [1], "b": [2]}, path="b") == [2]
+
+    cols = columnar.concat({"r1": data, "r2": {"jsonrpc": "2.0", "id": 1, "result": {"clients": [{"mac": "00:13"}]}},
+                            "r3": ConnectionError()})
+    assert cols["host"] == ["r1", "r1", "r2"] and cols["mac"] == ["00:11", "00:12", "00:13"]
+    assert cols["alias"] == [None, "tv", None]
+
+    cols = fleet.columns([glinet_stub, GlInet(url="http://127.0.0.1:1/rpc", keep_alive=False,
+                                              cache_folder=glinet_stub._cache_folder)], ["clients", "get_list"])
+    host = urllib.parse.urlsplit(stub_router.url).netloc
+    assert cols == {"host": [host], "mac": ["00:11"], "online": [True], "rx": [1]}
+
+
+def test_columnar_conversion():
+    pytest.importorskip("numpy")
+    pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    cols = columnar.concat({"r1": COLUMNAR_RESPONSE})
+    arrays = columnar.to_numpy(cols)
+    assert arrays["rx"].dtype == float and arrays["wifi.rssi"][0] == -40
+    assert arrays["tags"].dtype == object and arrays["tags"][0] == ["a"]
+    assert list(columnar.to_pandas(cols).columns) == list(cols)
+    assert columnar.to_arrow(cols).num_rows == 2
+
+
+def test_file_lock_timeout(tmp_path):
+    file = (tmp_path / "test.lock").as_posix()
+    with session_store.FileLock(file):
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            session_store.FileLock(file, timeout=0.2).acquire()
+        assert 0.2 <= time.monotonic() - start < 1
+    with session_store.FileLock(file, timeout=0.2):
+        pass